@@ -54,7 +54,8 @@ parser.add_argument('--excel',
                     const = True, 
                     default = False,
                     dest = 'excel',
-                    help = "Whether or not to write output to excel. Default is False")
+                    help = ("Whether or not to write output to excel (data.xlsx, as well as data.csv). "
+                            "Default is False"))
 parser.add_argument('--field-filter',
                     type = str_to_bool,
                     nargs = '?',
@@ -62,9 +63,32 @@ parser.add_argument('--field-filter',
                     default = False,
                     dest = 'field_filter',
                     help = "Whether or not to filter out superfluous fields (columns) in the excel output. Default is False")                                      
+parser.add_argument('--feed-catalog',
+                    type = str_to_bool,
+                    nargs = '?',
+                    const = True, 
+                    default = True,
+                    dest = 'feed_catalog',
+                    help = ("Whether or not to check a (cached) listing of the FTP server and only scan dates "
+                            "that have a nightly file, largest first. Default is True"))
+parser.add_argument('--compression',
+                    type = str,
+                    choices = ['gzip', 'zstd'],
+                    default = None,
+                    dest = 'compression',
+                    help = ("Write each date's notices as compressed NDJSON (one notice per line) "
+                            "instead of a single JSON file. zstd requires the zstandard package. Default is None"))
+parser.add_argument('--sheet-by',
+                    type = str,
+                    choices = ['type', 'month'],
+                    default = 'type',
+                    dest = 'sheet_by',
+                    help = "Whether the excel output has a sheet per notice type or per month. Default is type")
 
+from utils.feed_catalog import get_feed_catalog, plan_dates
 from utils.get_nightly_data import get_nightly_data
 from utils.writer import write_to_csv, get_last_scan_date
+from utils.xlsx_writer import write_to_xlsx
 
 logger = logging.getLogger(__name__)
 
@@ -110,7 +134,8 @@ def get_dates(start_date = None, end_date = None):
     
     return fbo_dates
 
-def main(from_jupyter = False, start_date = None, end_date = None, tbm_filter = False):
+def main(from_jupyter = False, start_date = None, end_date = None, tbm_filter = False, compression = None,
+         feed_catalog = True, sheet_by = 'type'):
     """Void function that runs the nightly scraper using argparse to accept a user-defined date range
     and multiprocessing for a slight speed boost. Data is written to disk as JSON.
     
@@ -123,18 +148,36 @@ def main(from_jupyter = False, start_date = None, end_date = None, tbm_filter =
         tbm_filter = args.tbm_filter
         excel = args.excel
         field_filter = args.field_filter
+        compression = args.compression
+        feed_catalog = args.feed_catalog
+        sheet_by = args.sheet_by
     else:
         fbo_dates = get_dates(start_date = start_date, end_date = end_date)
         excel = True
         field_filter = True
     
-    # By default, the executor sets number of workers to the # of CPUs.
-    with ProcessPoolExecutor() as executor:
-        fn = partial(get_nightly_data, tbm_filtering = tbm_filter)
-        executor.map(fn, fbo_dates)
+    if feed_catalog and fbo_dates:
+        catalog = get_feed_catalog(newest_date = max(fbo_dates))
+        fbo_dates = plan_dates(fbo_dates, catalog)
+    if len(fbo_dates) == 1:
+        # With a single date there's nothing to spread across processes except the parsing of its file.
+        # A failed date is logged and skipped, as it is when the date runs in the executor below.
+        try:
+            get_nightly_data(fbo_dates[0], tbm_filtering = tbm_filter, compression = compression,
+                             workers = os.cpu_count())
+        except SystemExit:
+            logger.error(f"Skipping {fbo_dates[0]}")
+        except Exception:
+            logger.exception(f"Failed to get the nightly data for {fbo_dates[0]}")
+    else:
+        # By default, the executor sets number of workers to the # of CPUs.
+        with ProcessPoolExecutor() as executor:
+            fn = partial(get_nightly_data, tbm_filtering = tbm_filter, compression = compression)
+            executor.map(fn, fbo_dates)
     
     if excel:
         write_to_csv(field_filter)
+        write_to_xlsx(field_filter, sheet_by)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__) ) ) )
+from utils.feed_catalog import parse_list_line, get_feed_catalog, plan_dates
+
+
+class FeedCatalogTestCase(unittest.TestCase):
+    '''
+    Test cases for functions in utils/feed_catalog.py
+    '''
+
+    def setUp(self):
+        self.maxDiff = None
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.catalog_file = os.path.join(self.tmp_dir.name, 'feed_catalog.json')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write_cache(self, files, age):
+        fetched_at = datetime.utcnow() - age
+        with open(self.catalog_file, 'w') as f:
+            json.dump({'fetched_at': fetched_at.strftime("%Y-%m-%dT%H:%M:%S"), 'files': files}, f)
+
+    def test_parse_list_line_unix(self):
+        result = parse_list_line('-rw-r--r--   1 ftp      ftp       3452101 Feb 03  2019 FBOFeed20190203')
+        expected = ('FBOFeed20190203', 3452101)
+        self.assertEqual(result, expected)
+
+    def test_parse_list_line_dos(self):
+        result = parse_list_line('02-03-19  11:59PM              3452101 FBOFeed20190203')
+        expected = ('FBOFeed20190203', 3452101)
+        self.assertEqual(result, expected)
+
+    def test_parse_list_line_garbage(self):
+        result = parse_list_line('total 12')
+        self.assertIsNone(result)
+
+    @patch('utils.feed_catalog.list_feed_files')
+    def test_get_feed_catalog_fresh_cache(self, mock_list):
+        self.write_cache({'20190203': 10}, timedelta(hours = 1))
+        result = get_feed_catalog(self.catalog_file, newest_date = '20190203')
+        self.assertEqual(result, {'20190203': 10})
+        mock_list.assert_not_called()
+
+    @patch('utils.feed_catalog.list_feed_files')
+    def test_get_feed_catalog_stale_cache(self, mock_list):
+        mock_list.return_value = {'20190203': 10, '20190204': 20}
+        self.write_cache({'20190203': 10}, timedelta(days = 1))
+        result = get_feed_catalog(self.catalog_file)
+        self.assertEqual(result, {'20190203': 10, '20190204': 20})
+        with open(self.catalog_file) as f:
+            self.assertEqual(json.load(f)['files'], result)
+
+    @patch('utils.feed_catalog.list_feed_files')
+    def test_get_feed_catalog_newer_date(self, mock_list):
+        mock_list.return_value = {'20190203': 10, '20190204': 20}
+        self.write_cache({'20190203': 10}, timedelta(hours = 1))
+        result = get_feed_catalog(self.catalog_file, newest_date = '20190204')
+        self.assertEqual(result, {'20190203': 10, '20190204': 20})
+
+    @patch('utils.feed_catalog.list_feed_files')
+    def test_get_feed_catalog_unreachable(self, mock_list):
+        mock_list.side_effect = OSError('timed out')
+        result = get_feed_catalog(self.catalog_file)
+        self.assertIsNone(result)
+        self.write_cache({'20190203': 10}, timedelta(days = 1))
+        result = get_feed_catalog(self.catalog_file)
+        self.assertEqual(result, {'20190203': 10})
+
+    @patch('utils.feed_catalog.list_feed_files')
+    def test_get_feed_catalog_truncated_cache(self, mock_list):
+        #e.g. a run was killed while writing the cache
+        with open(self.catalog_file, 'w') as f:
+            f.write('{"fetched_at": "2019-02-')
+        mock_list.return_value = {'20190203': 10}
+        result = get_feed_catalog(self.catalog_file)
+        self.assertEqual(result, {'20190203': 10})
+        with open(self.catalog_file) as f:
+            self.assertEqual(json.load(f)['files'], result)
+        self.assertFalse(os.path.exists(self.catalog_file + '.tmp'))
+
+    def test_plan_dates(self):
+        catalog = {'20190501': 10, '20190502': 30, '20190504': 20}
+        result = plan_dates(['20190501', '20190502', '20190503', '20190504'], catalog)
+        expected = ['20190502', '20190504', '20190501']
+        self.assertEqual(result, expected)
+
+    def test_plan_dates_no_catalog(self):
+        result = plan_dates(['20190501', '20190502'], None)
+        expected = ['20190501', '20190502']
+        self.assertEqual(result, expected)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__) ) ) )
+from utils.ftp_client import FTPSessionPool, download_file
+
+
+class FakeFTP:
+    '''
+    Stands in for ftplib.FTP, serving the files in FakeFTP.files
+    '''
+    files = {}
+    mtimes = {}
+    instances = []
+    #the number of bytes to send before dropping the connection, if any
+    fail_after = None
+
+    def __init__(self, timeout = None):
+        self.closed = False
+        self.commands = []
+        FakeFTP.instances.append(self)
+
+    def connect(self, host, port):
+        self.commands.append('CONNECT')
+
+    def login(self, user, passwd):
+        self.commands.append('USER')
+
+    def voidcmd(self, cmd):
+        if self.closed:
+            raise EOFError()
+        self.commands.append(cmd)
+
+    def size(self, path):
+        return len(self.files[path])
+
+    def sendcmd(self, cmd):
+        self.commands.append(cmd)
+        path = cmd.split(' ', 1)[1]
+        return f'213 {self.mtimes.get(path, "20190501000000")}'
+
+    def retrbinary(self, cmd, callback, rest = None):
+        path = cmd.split(' ', 1)[1]
+        self.commands.append(f'REST {rest}')
+        data = self.files[path][rest or 0:]
+        if FakeFTP.fail_after is not None:
+            callback(data[:FakeFTP.fail_after])
+            FakeFTP.fail_after = None
+            raise ConnectionResetError('connection reset')
+        callback(data)
+
+    def close(self):
+        self.closed = True
+
+    def quit(self):
+        self.closed = True
+
+
+@patch('utils.ftp_client.ftplib.FTP', FakeFTP)
+class FTPClientTestCase(unittest.TestCase):
+    '''
+    Test cases for functions in utils/ftp_client.py
+    '''
+
+    def setUp(self):
+        FakeFTP.files = {'FBOFeed20190501': b'a' * 100, 'FBOFeed20190502': b'b' * 50}
+        FakeFTP.mtimes = {}
+        FakeFTP.instances = []
+        FakeFTP.fail_after = None
+        self.pool = FTPSessionPool()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.pool.close()
+        self.tmp_dir.cleanup()
+
+    def download(self, date, **kwargs):
+        file_name = os.path.join(self.tmp_dir.name, date)
+        stats = download_file(f'ftp://ftp.fbo.gov/FBOFeed{date}', file_name, self.pool, **kwargs)
+        with open(file_name, 'rb') as f:
+            return f.read(), stats
+
+    def test_download_file_reuses_session(self):
+        first, _ = self.download('20190501')
+        second, stats = self.download('20190502')
+        self.assertEqual(first, b'a' * 100)
+        self.assertEqual(second, b'b' * 50)
+        self.assertEqual(len(FakeFTP.instances), 1)
+        self.assertEqual(stats['bytes'], 50)
+
+    def test_download_file_replaces_dropped_session(self):
+        self.download('20190501')
+        FakeFTP.instances[0].closed = True
+        result, _ = self.download('20190502')
+        self.assertEqual(result, b'b' * 50)
+        self.assertEqual(len(FakeFTP.instances), 2)
+
+    def test_download_file_resumes(self):
+        FakeFTP.fail_after = 30
+        result, stats = self.download('20190501')
+        self.assertEqual(result, b'a' * 100)
+        self.assertEqual(stats['attempts'], 2)
+        self.assertIn('REST 30', FakeFTP.instances[1].commands)
+
+    def write_partial_file(self, date, data, version):
+        file_name = os.path.join(self.tmp_dir.name, date)
+        with open(file_name, 'wb') as f:
+            f.write(data)
+        if version:
+            with open(f'{file_name}.part', 'w') as f:
+                json.dump(version, f)
+
+    def test_download_file_resumes_partial_file(self):
+        self.write_partial_file('20190501', b'a' * 60, {'size': 100, 'modified': '20190501000000'})
+        result, stats = self.download('20190501')
+        self.assertEqual(result, b'a' * 100)
+        self.assertEqual(stats['bytes'], 40)
+        self.assertEqual(stats['resumed_from'], 60)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir.name, '20190501.part')))
+
+    def test_download_file_restarts_stale_partial_file(self):
+        #the file was republished with the same size since the partial download
+        self.write_partial_file('20190501', b'x' * 60, {'size': 100, 'modified': '20190430000000'})
+        result, stats = self.download('20190501')
+        self.assertEqual(result, b'a' * 100)
+        self.assertEqual(stats['resumed_from'], 0)
+
+    def test_download_file_restarts_unrecorded_partial_file(self):
+        self.write_partial_file('20190501', b'x' * 60, None)
+        result, stats = self.download('20190501')
+        self.assertEqual(result, b'a' * 100)
+        self.assertEqual(stats['bytes'], 100)
+
+    def test_download_file_gives_up(self):
+        FakeFTP.fail_after = 30
+        with self.assertRaises(ConnectionResetError):
+            self.download('20190501', retries = 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 import json
 import os
 import sys
+import tempfile
 import unittest
 from unittest.mock import patch, Mock
 
@@ -10,7 +11,10 @@ import requests_mock
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__) ) ) )
 from utils.get_nightly_data import clean_line_text, get_email_from_url, extract_emails, \
-    merge_dicts, id_and_count_notice_tags, pseudo_xml_to_json, get_nightly_data, tbm_filter
+    merge_dicts, id_and_count_notice_tags, pseudo_xml_to_json, get_nightly_data, tbm_filter, \
+    parse_feed_bytes, pseudo_xml_to_json_mmap, iter_line_spans, split_feed_lines, split_feed_bytes, \
+    find_emails, extract_emails_batch
+from utils.writer import write_to_csv
 from fixtures.nightly_file import nightly_file
 from fixtures import pseudo_xml_to_json_expected
 
@@ -110,6 +114,29 @@ class GetNightlyDataTestCase(unittest.TestCase):
         expected = ['foo.bar.civ@mail.mil']
         self.assertEqual(result, expected)
 
+    def test_extract_emails_dedup(self):
+        notice = {'CONTACT':'Foo.Bar@gsa.gov or foo.bar@gsa.gov, baz@gsa.gov and baz@gsa.gov'}
+        result = extract_emails(notice)
+        expected = ['foo.bar@gsa.gov', 'baz@gsa.gov']
+        self.assertEqual(result, expected)
+
+    def test_find_emails_cache(self):
+        cache = {}
+        text = 'email a@gsa.gov or <b@gsa.gov>'
+        result = find_emails(text, cache)
+        expected = ['a@gsa.gov']
+        self.assertEqual(result, expected)
+        self.assertIs(find_emails(text, cache), result)
+
+    def test_extract_emails_batch(self):
+        data = {'PRESOL':[{'CONTACT':'no email here :(', 'DESC':'write to foo.bar@gsa.gov'},
+                          {'CONTACT':'Foo.Bar@gsa.gov'}],
+                'MOD':[{'CONTACT':'no email here :(', 'URL':'https://www.fbo.gov'}]}
+        result = extract_emails_batch(data, scrape = False)
+        expected = {'PRESOL':[['foo.bar@gsa.gov'], ['foo.bar@gsa.gov']],
+                    'MOD':[None]}
+        self.assertEqual(result, expected)
+
     def test_id_and_count_notice_tags(self):
         result = id_and_count_notice_tags(self.file_lines)
         expected = {'PRESOL': 1, 'COMBINE': 1, 'ARCHIVE': 1,
@@ -127,6 +154,74 @@ class GetNightlyDataTestCase(unittest.TestCase):
         expected = pseudo_xml_to_json_expected.merge_notices_dict
         self.assertEqual(result, expected)
 
+    def test_pseudo_xml_to_json_mmap(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_name = os.path.join(tmp_dir, 'fbo_nightly_20190203')
+            with open(file_name, 'w') as f:
+                f.writelines(self.file_lines)
+            result = pseudo_xml_to_json_mmap(file_name)
+        expected = pseudo_xml_to_json_expected.merge_notices_dict
+        self.assertEqual(result, expected)
+
+    def test_parse_feed_bytes_matches_text_mode(self):
+        raw = ('<PRESOL>\r\n<DATE>0302\r\n<SUBJECT>  Caf\u00e9\xa0<B>repairs</B>\r\n'
+               '<DESC><p>Line one<br />and two</p>\r\n\r\nmore <a href="http://x.gov">here</a>\r'
+               '<CONTACT> <a href="mailto:a@b.gov">a@b.gov</a>\n</PRESOL>\n\n'
+               '<AWARD>\n<DESC>awarded\n</AWARD>\n').encode('utf8')
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_name = os.path.join(tmp_dir, 'fbo_nightly_20190203')
+            with open(file_name, 'wb') as f:
+                f.write(raw)
+            with open(file_name, 'r', errors='ignore') as f:
+                file_lines = f.readlines()
+        result = parse_feed_bytes(raw)
+        expected = pseudo_xml_to_json(file_lines)
+        self.assertEqual(result, expected)
+        self.assertEqual(len(list(iter_line_spans(raw))), len(file_lines))
+
+    def test_parse_feed_bytes_fields(self):
+        raw = ''.join(self.file_lines).encode('utf8')
+        result = parse_feed_bytes(raw, fields = {'SUBJECT', 'DESC'})
+        expected = {k: [{f: v for f, v in notice.items() if f in {'SUBJECT', 'DESC'}} for notice in notices]
+                    for k, notices in pseudo_xml_to_json_expected.merge_notices_dict.items()}
+        self.assertEqual(result, expected)
+
+    def test_split_feed_lines(self):
+        chunks = split_feed_lines(self.file_lines, 3)
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(sum(chunks, []), self.file_lines)
+        for chunk in chunks[1:]:
+            self.assertRegex(chunk[0], r'^<[A-Z]+>')
+
+    def test_pseudo_xml_to_json_workers(self):
+        result = pseudo_xml_to_json(self.file_lines * 3, workers = 2)
+        expected = pseudo_xml_to_json(self.file_lines * 3)
+        self.assertEqual(result, expected)
+
+    def test_pseudo_xml_to_json_mmap_workers(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_name = os.path.join(tmp_dir, 'fbo_nightly_20190203')
+            with open(file_name, 'w') as f:
+                f.writelines(self.file_lines * 3)
+            with open(file_name, 'rb') as f:
+                chunks = split_feed_bytes(f.read(), 4)
+            result = pseudo_xml_to_json_mmap(file_name, workers = 2)
+        expected = pseudo_xml_to_json(self.file_lines * 3)
+        self.assertEqual(len(chunks), 4)
+        self.assertEqual(result, expected)
+
+    def test_pseudo_xml_to_json_mmap_workers_range(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_name = os.path.join(tmp_dir, 'feed')
+            with open(file_name, 'w') as f:
+                f.writelines(self.file_lines * 3)
+            with open(file_name, 'rb') as f:
+                chunks = split_feed_bytes(f.read(), 3)
+            start, end = chunks[1]
+            result = pseudo_xml_to_json_mmap(file_name, workers = 2, start = start, end = end)
+            expected = pseudo_xml_to_json_mmap(file_name, start = start, end = end)
+        self.assertEqual(result, expected)
+
     def test_get_nightly_data(self):
         #use it on real data for an end-to-end test
         date = '20190203'
@@ -138,6 +233,63 @@ class GetNightlyDataTestCase(unittest.TestCase):
         os.remove(os.path.join(os.getcwd(), 'data', f'{date}-result.json'))
         self.assertTrue(True)
 
+    @patch('utils.get_nightly_data.download_feed_file')
+    def test_get_nightly_data_rescan(self, mock_download):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.chdir(tmp_dir)
+            try:
+                def download(date, fbo_ftp_url):
+                    with open('feed', 'w') as f:
+                        f.writelines(self.file_lines)
+                    return 'feed'
+                mock_download.side_effect = download
+                json_file = os.path.join('data', '20190203-result.json')
+                get_nightly_data(date = '20190203', tbm_filtering = False)
+                with open(json_file) as f:
+                    result = json.load(f)
+                write_to_csv()
+                #scanning the same date again shouldn't store anything new
+                get_nightly_data(date = '20190203', tbm_filtering = False)
+                rescanned = os.path.exists(json_file)
+            finally:
+                os.chdir(cwd)
+        expected = pseudo_xml_to_json_expected.merge_notices_dict
+        self.assertEqual(result, expected)
+        self.assertFalse(rescanned)
+
+    @patch('utils.get_nightly_data.download_feed_file')
+    def test_get_nightly_data_rescan_pending(self, mock_download):
+        file_lines = list(self.file_lines)
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.chdir(tmp_dir)
+            try:
+                def download(date, fbo_ftp_url):
+                    with open('feed', 'w') as f:
+                        f.writelines(file_lines)
+                    return 'feed'
+                mock_download.side_effect = download
+                json_file = os.path.join('data', '20190203-result.json')
+                get_nightly_data(date = '20190203', tbm_filtering = False)
+                #change a notice and scan again before write_to_csv() has read the first file
+                i = next(i for i, line in enumerate(file_lines) if line.startswith('<SUBJECT>'))
+                file_lines[i] = '<SUBJECT>A changed subject\n'
+                get_nightly_data(date = '20190203', tbm_filtering = False)
+                with open(json_file) as f:
+                    result = json.load(f)
+                write_to_csv()
+                #now that both versions are in data.csv, a third scan has nothing new
+                get_nightly_data(date = '20190203', tbm_filtering = False)
+                rescanned = os.path.exists(json_file)
+            finally:
+                os.chdir(cwd)
+        n_expected = sum(len(v) for v in pseudo_xml_to_json_expected.merge_notices_dict.values())
+        self.assertEqual(sum(len(v) for v in result.values()), n_expected + 1)
+        subjects = [notice.get('SUBJECT') for notices in result.values() for notice in notices]
+        self.assertIn('A changed subject', subjects)
+        self.assertFalse(rescanned)
+
     def test_tbm_filter(self):
         data = {'PRESOL':[{'DESC':'This is a tbm solicitation.'},
                           {'DESC':'This is a dltbm solicitation.'},
@@ -0,0 +1,75 @@
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__) ) ) )
+from utils.lru import LRUCache, stats_delta
+from utils.get_nightly_data import CLEAN_LINE_CACHE, pseudo_xml_to_json
+from fixtures.nightly_file import nightly_file
+
+
+class LRUCacheTestCase(unittest.TestCase):
+    '''
+    Test cases for utils/lru.py
+    '''
+
+    def setUp(self):
+        self.maxDiff = None
+
+    def tearDown(self):
+        CLEAN_LINE_CACHE.clear()
+
+    def test_get_or_compute(self):
+        cache = LRUCache(max_entries = 10)
+        calls = []
+        def fn(key):
+            calls.append(key)
+            return key.upper()
+        self.assertEqual(cache.get_or_compute('a', fn), 'A')
+        self.assertEqual(cache.get_or_compute('a', fn), 'A')
+        self.assertEqual(calls, ['a'])
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_max_entries(self):
+        cache = LRUCache(max_entries = 2)
+        cache.get_or_compute('a', str.upper)
+        cache.get_or_compute('b', str.upper)
+        cache.get_or_compute('a', str.upper)
+        cache.get_or_compute('c', str.upper)
+        #b was the least recently used
+        cache.get_or_compute('b', str.upper)
+        stats = cache.stats()
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 4)
+        self.assertEqual(stats['evictions'], 2)
+
+    def test_max_bytes(self):
+        size = sys.getsizeof('a' * 100) * 2
+        cache = LRUCache(max_bytes = size * 3)
+        for c in 'abcde':
+            cache.get_or_compute(c * 100, lambda key: key)
+        self.assertEqual(len(cache), 3)
+        self.assertLessEqual(cache.bytes, size * 3)
+        #values too big to ever fit aren't cached
+        cache.get_or_compute('z' * 1000, lambda key: key)
+        self.assertEqual(len(cache), 3)
+
+    def test_stats_delta(self):
+        before = {'hits': 1, 'misses': 1, 'evictions': 0, 'entries': 1, 'bytes': 10}
+        after = {'hits': 4, 'misses': 2, 'evictions': 0, 'entries': 2, 'bytes': 20}
+        result = stats_delta(before, after)
+        expected = {'hits': 3, 'misses': 1, 'evictions': 0, 'hit_rate': 0.75}
+        self.assertEqual(result, expected)
+
+    def test_clean_line_cache_counts_workers(self):
+        CLEAN_LINE_CACHE.clear()
+        before = CLEAN_LINE_CACHE.stats()
+        pseudo_xml_to_json(nightly_file * 4, workers = 2)
+        result = stats_delta(before, CLEAN_LINE_CACHE.stats())
+        self.assertGreater(result['misses'], 0)
+        self.assertGreater(result['hits'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
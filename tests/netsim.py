@@ -0,0 +1,395 @@
+'''
+Local stand-ins for ftp.fbo.gov and www.fbo.gov that inject latency, bandwidth caps, stalls,
+truncated transfers and errors, plus a runner that measures scan throughput and tail latency
+under each set of conditions. Use it to tune timeouts and concurrency:
+
+    python tests/netsim.py --files 20 --concurrency 4 --timeout 5
+'''
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import logging
+import os
+import random
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__) ) ) )
+from utils.ftp_client import FTPSessionPool, download_file
+from utils.get_nightly_data import get_email_from_url, pseudo_xml_to_json_mmap
+from fixtures.nightly_file import nightly_file
+
+NOTICE_PAGE = ('<html><body><div><a href="mailto:foo.bar@gsa.gov">foo.bar@gsa.gov</a></div>'
+               + '<p>boilerplate</p>' * 200 + '</body></html>').encode('utf8')
+
+
+class Conditions:
+    '''
+    The network conditions a stand-in server simulates.
+    '''
+
+    def __init__(self, latency = 0.0, bandwidth = None, error_rate = 0.0, truncate_rate = 0.0,
+                 stall_rate = 0.0, stall_seconds = 0.0, max_faults = None, seed = 0):
+        '''
+        Parameters:
+            latency (float): seconds to wait before answering each command or request
+            bandwidth (None or int): the maximum transfer rate in bytes per second
+            error_rate (float): the probability that a download or request fails outright
+                                (451 for FTP, 500 for HTTP)
+            truncate_rate (float): the probability that a transfer is cut off part way through
+            stall_rate (float): the probability that a transfer stops for stall_seconds part way through
+            stall_seconds (float): how long a stall lasts
+            max_faults (None or int): stop injecting errors, truncations and stalls after this many
+            seed (int): the seed for the random number generator, so runs are repeatable
+        '''
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.truncate_rate = truncate_rate
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+        self.max_faults = max_faults
+        self.faults = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _fault(self, rate):
+        with self._lock:
+            if self.max_faults is not None and self.faults >= self.max_faults:
+                return False
+            if self._rng.random() < rate:
+                self.faults += 1
+                return True
+            return False
+
+    def delay(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def fail(self):
+        return self._fault(self.error_rate)
+
+    def send(self, conn, payload, chunk_size = 16384):
+        '''
+        Send payload over a socket, subject to the bandwidth cap, stalls and truncation.
+        Returns:
+            (bool): False if the transfer was truncated
+        '''
+        with self._lock:
+            truncate_at = self._rng.randint(1, max(1, len(payload) - 1))
+            stall_at = self._rng.randint(0, len(payload))
+        truncate_at = truncate_at if self._fault(self.truncate_rate) else None
+        stall_at = stall_at if self._fault(self.stall_rate) else None
+        for pos in range(0, len(payload), chunk_size):
+            piece = payload[pos:pos + chunk_size]
+            if stall_at is not None and pos + len(piece) >= stall_at:
+                time.sleep(self.stall_seconds)
+                stall_at = None
+            if truncate_at is not None and pos + len(piece) >= truncate_at:
+                conn.sendall(piece[:truncate_at - pos])
+                return False
+            conn.sendall(piece)
+            if self.bandwidth:
+                time.sleep(len(piece) / self.bandwidth)
+
+        return True
+
+
+class FTPHandler(socketserver.StreamRequestHandler):
+    '''
+    Just enough of an FTP server (RFC 959) for utils.ftp_client and utils.feed_catalog.
+    '''
+
+    def handle(self):
+        self.rest = 0
+        self.pasv = None
+        self.reply('220 netsim FTP stand-in')
+        try:
+            for raw in self.rfile:
+                cmd, _, arg = raw.decode('latin1').strip().partition(' ')
+                self.server.conditions.delay()
+                handler = getattr(self, f'ftp_{cmd.lower()}', None)
+                if handler is None:
+                    self.reply(f'502 {cmd} not implemented')
+                elif handler(arg) is False:
+                    break
+        except OSError:
+            #the client hung up, e.g. after timing out on a stall
+            pass
+        finally:
+            self.close_pasv()
+
+    def reply(self, msg):
+        self.wfile.write(f'{msg}\r\n'.encode('latin1'))
+
+    def close_pasv(self):
+        if self.pasv:
+            self.pasv.close()
+            self.pasv = None
+
+    def send_data(self, payload):
+        self.reply('150 Opening BINARY mode data connection')
+        conn, _ = self.pasv.accept()
+        try:
+            complete = self.server.conditions.send(conn, payload)
+        finally:
+            conn.close()
+            self.close_pasv()
+        self.reply('226 Transfer complete' if complete else '426 Connection closed; transfer aborted')
+
+    def ftp_user(self, arg):
+        self.reply('331 Password required')
+
+    def ftp_pass(self, arg):
+        self.reply('230 Logged in')
+
+    def ftp_type(self, arg):
+        self.reply('200 Type set')
+
+    def ftp_noop(self, arg):
+        self.reply('200 NOOP ok')
+
+    def ftp_size(self, arg):
+        data = self.server.files.get(arg)
+        self.reply(f'213 {len(data)}' if data is not None else '550 No such file')
+
+    def ftp_mdtm(self, arg):
+        mtime = self.server.mtimes.get(arg)
+        self.reply(f'213 {mtime}' if mtime else '550 No such file')
+
+    def ftp_rest(self, arg):
+        self.rest = int(arg)
+        self.reply(f'350 Restarting at {self.rest}')
+
+    def ftp_pasv(self, arg):
+        self.close_pasv()
+        #socket.create_server() would do, but it's new in Python 3.8
+        self.pasv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.pasv.bind(('127.0.0.1', 0))
+        self.pasv.listen(1)
+        port = self.pasv.getsockname()[1]
+        self.reply(f'227 Entering Passive Mode (127,0,0,1,{port >> 8},{port & 0xff})')
+
+    def ftp_retr(self, arg):
+        data = self.server.files.get(arg)
+        rest, self.rest = self.rest, 0
+        if data is None:
+            self.close_pasv()
+            self.reply('550 No such file')
+        elif self.server.conditions.fail():
+            self.close_pasv()
+            self.reply('451 Requested action aborted: injected error')
+        else:
+            self.send_data(data[rest:])
+
+    def ftp_mlsd(self, arg):
+        listing = ''.join(f'type=file;size={len(data)}; {name}\r\n'
+                          for name, data in self.server.files.items())
+        self.send_data(listing.encode('latin1'))
+
+    def ftp_opts(self, arg):
+        self.reply('200 OPTS ok')
+
+    def ftp_list(self, arg):
+        listing = ''.join(f'-rw-r--r--   1 ftp      ftp      {len(data):>10} Jan 01  2019 {name}\r\n'
+                          for name, data in self.server.files.items())
+        self.send_data(listing.encode('latin1'))
+
+    def ftp_quit(self, arg):
+        self.reply('221 Bye')
+        return False
+
+
+class HTTPHandler(BaseHTTPRequestHandler):
+    '''
+    Serves an fbo notice page with a mailto link for every GET.
+    '''
+
+    def do_GET(self):
+        conditions = self.server.conditions
+        conditions.delay()
+        if conditions.fail():
+            self.send_error(500, 'injected error')
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(NOTICE_PAGE)))
+        self.end_headers()
+        try:
+            if not conditions.send(self.connection, NOTICE_PAGE):
+                self.close_connection = True
+        except OSError:
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ThreadingFTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+@contextmanager
+def serve(server):
+    thread = threading.Thread(target = server.serve_forever, daemon = True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@contextmanager
+def ftp_stand_in(files, conditions = None, mtimes = None):
+    '''
+    Run an FTP stand-in on localhost.
+    Parameters:
+        files (dict): file names as keys and their contents (bytes) as values
+        conditions (None or Conditions): the network conditions to simulate
+        mtimes (None or dict): file names as keys and their modification times ("%Y%m%d%H%M%S")
+                               as values. Defaults to the same time for every file
+    Yields:
+        url (str): the ftp:// url of the server
+    '''
+    server = ThreadingFTPServer(('127.0.0.1', 0), FTPHandler)
+    server.files = files
+    server.mtimes = mtimes or {name: '20190101000000' for name in files}
+    server.conditions = conditions or Conditions()
+    with serve(server):
+        yield f'ftp://127.0.0.1:{server.server_address[1]}'
+
+
+@contextmanager
+def http_stand_in(conditions = None):
+    '''
+    Run an HTTP stand-in for fbo notice pages on localhost.
+    Yields:
+        url (str): the http:// url of the server
+    '''
+    server = ThreadingHTTPServer(('127.0.0.1', 0), HTTPHandler)
+    server.daemon_threads = True
+    server.conditions = conditions or Conditions()
+    with serve(server):
+        yield f'http://127.0.0.1:{server.server_address[1]}'
+
+
+SCENARIOS = {
+    'baseline': Conditions(),
+    'slow link': Conditions(latency = 0.05, bandwidth = 256 * 1024),
+    'flaky': Conditions(error_rate = 0.1, truncate_rate = 0.2),
+    'stalls': Conditions(stall_rate = 0.2, stall_seconds = 8),
+    'everything': Conditions(latency = 0.05, bandwidth = 512 * 1024, error_rate = 0.05,
+                             truncate_rate = 0.1, stall_rate = 0.1, stall_seconds = 8),
+}
+
+
+def percentile(values, p):
+    '''
+    The nearest-rank percentile of a list of numbers.
+    '''
+    values = sorted(values)
+    if not values:
+        return float('nan')
+
+    return values[min(len(values) - 1, max(0, int(round(p / 100 * len(values))) - 1))]
+
+
+def run_scenario(conditions, n_files = 10, feed_copies = 20, concurrency = 4, timeout = 5,
+                 scrapes_per_file = 3, http_conditions = None):
+    '''
+    Scan n_files nightly files from the stand-ins under the given conditions. Each scan downloads
+    a file, parses it and scrapes a few notice pages, as a scan that enriches emails would. The
+    scrapes are timed and counted on their own since get_email_from_url() doesn't raise when a
+    page can't be fetched: every stand-in page has a mailto link, so a scrape that finds none failed.
+    Parameters:
+        conditions (Conditions): the network conditions to simulate
+        n_files (int): the number of nightly files to scan
+        feed_copies (int): how many copies of the test fixture make up each nightly file
+        concurrency (int): the number of files scanned at once
+        timeout (int): the FTP and HTTP timeout in seconds
+        scrapes_per_file (int): the number of notice pages scraped for each file
+        http_conditions (None or Conditions): the conditions for the HTTP stand-in. Defaults to conditions
+    Returns:
+        results (dict): counts of ok and failed scans (downloading and parsing) and scrapes,
+                        throughput and latency percentiles
+    '''
+    feed = ''.join(nightly_file * feed_copies).encode('utf8')
+    files = {f'FBOFeed{20190101 + i}': feed for i in range(n_files)}
+    pool = FTPSessionPool(max_sessions = concurrency, timeout = timeout)
+    with tempfile.TemporaryDirectory() as tmp_dir, \
+         ftp_stand_in(files, conditions) as ftp_url, \
+         http_stand_in(http_conditions or conditions) as http_url:
+        def scan(name):
+            start = time.monotonic()
+            file_name = os.path.join(tmp_dir, name)
+            scrapes = []
+            try:
+                download_file(f'{ftp_url}/{name}', file_name, pool)
+                pseudo_xml_to_json_mmap(file_name)
+                ok = True
+            except Exception:
+                ok = False
+            for i in range(scrapes_per_file):
+                scrape_start = time.monotonic()
+                hrefs = get_email_from_url(f'{http_url}/{name}/{i}', timeout = timeout)
+                scrapes.append((bool(hrefs), time.monotonic() - scrape_start))
+            return ok, time.monotonic() - start, scrapes
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers = concurrency) as executor:
+            scans = list(executor.map(scan, files))
+        elapsed = time.monotonic() - start
+    pool.close()
+    latencies = [seconds for _, seconds, _ in scans]
+    ok = sum(1 for succeeded, _, _ in scans if succeeded)
+    scrapes = [scrape for _, _, file_scrapes in scans for scrape in file_scrapes]
+    scrapes_ok = sum(1 for succeeded, _ in scrapes if succeeded)
+    scrape_latencies = [seconds for _, seconds in scrapes]
+
+    return {'ok': ok,
+            'failed': len(scans) - ok,
+            'files/s': ok / elapsed,
+            'MB/s': ok * len(feed) / elapsed / 1e6,
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'max': max(latencies),
+            'scrapes ok': scrapes_ok,
+            'scrapes failed': len(scrapes) - scrapes_ok,
+            'scrape p50': percentile(scrape_latencies, 50),
+            'scrape p95': percentile(scrape_latencies, 95)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Measure scan throughput and tail latency under '
+                                                   'simulated network conditions.')
+    parser.add_argument('--files', type = int, default = 10, help = 'nightly files per scenario')
+    parser.add_argument('--feed-copies', type = int, default = 20,
+                        help = 'copies of the test fixture in each nightly file')
+    parser.add_argument('--concurrency', type = int, default = 4, help = 'files scanned at once')
+    parser.add_argument('--timeout', type = int, default = 5, help = 'FTP and HTTP timeout in seconds')
+    parser.add_argument('--scrapes', type = int, default = 3, help = 'notice pages scraped per file')
+    parser.add_argument('--scenario', choices = list(SCENARIOS), action = 'append',
+                        help = 'the scenario(s) to run. Default is all of them')
+    args = parser.parse_args()
+    #the retries are expected, so keep their warnings out of the table
+    logging.basicConfig(level = logging.ERROR)
+    columns = ['ok', 'failed', 'files/s', 'MB/s', 'p50', 'p95', 'p99', 'max',
+               'scrapes ok', 'scrapes failed', 'scrape p50', 'scrape p95']
+    widths = [max(9, len(c) + 2) for c in columns]
+    print(f"{'scenario':<12}" + ''.join(f'{c:>{w}}' for c, w in zip(columns, widths)))
+    for name in args.scenario or SCENARIOS:
+        results = run_scenario(SCENARIOS[name], args.files, args.feed_copies, args.concurrency,
+                               args.timeout, args.scrapes)
+        print(f'{name:<12}' + ''.join(f'{results[c]:>{w}.2f}' if isinstance(results[c], float)
+                                      else f'{results[c]:>{w}}' for c, w in zip(columns, widths)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__) ) ) )
+from utils.feed_catalog import list_feed_files
+from utils.ftp_client import FTPSessionPool, download_file
+from utils.get_nightly_data import get_email_from_url
+from netsim import Conditions, ftp_stand_in, http_stand_in, run_scenario
+
+
+class NetsimTestCase(unittest.TestCase):
+    '''
+    Test cases for the stand-in servers in tests/netsim.py, which also exercise utils/ftp_client.py
+    against a real FTP conversation.
+    '''
+
+    def setUp(self):
+        self.maxDiff = None
+        self.files = {'FBOFeed20190501': os.urandom(100000)}
+        self.pool = FTPSessionPool(timeout = 2)
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file_name = os.path.join(self.tmp_dir.name, 'feed')
+
+    def tearDown(self):
+        self.pool.close()
+        self.tmp_dir.cleanup()
+
+    def read(self):
+        with open(self.file_name, 'rb') as f:
+            return f.read()
+
+    def test_download_file(self):
+        with ftp_stand_in(self.files) as url:
+            stats = download_file(f'{url}/FBOFeed20190501', self.file_name, self.pool)
+        self.assertEqual(self.read(), self.files['FBOFeed20190501'])
+        self.assertEqual(stats['attempts'], 1)
+
+    def test_download_file_truncated(self):
+        conditions = Conditions(truncate_rate = 1.0, max_faults = 1)
+        with ftp_stand_in(self.files, conditions) as url:
+            stats = download_file(f'{url}/FBOFeed20190501', self.file_name, self.pool)
+        self.assertEqual(self.read(), self.files['FBOFeed20190501'])
+        self.assertEqual(stats['attempts'], 2)
+
+    def test_download_file_error(self):
+        conditions = Conditions(error_rate = 1.0, max_faults = 1)
+        with ftp_stand_in(self.files, conditions) as url:
+            stats = download_file(f'{url}/FBOFeed20190501', self.file_name, self.pool)
+        self.assertEqual(self.read(), self.files['FBOFeed20190501'])
+        self.assertEqual(stats['attempts'], 2)
+
+    def test_download_file_republished(self):
+        #a partial download of an earlier version of the file mustn't be resumed
+        with open(self.file_name, 'wb') as f:
+            f.write(b'OLD' * 10)
+        with open(f'{self.file_name}.part', 'w') as f:
+            f.write('{"size": 100, "modified": "20190101000000"}')
+        files = {'FBOFeed20190501': b'N' * 100}
+        with ftp_stand_in(files, mtimes = {'FBOFeed20190501': '20190102000000'}) as url:
+            stats = download_file(f'{url}/FBOFeed20190501', self.file_name, self.pool)
+        self.assertEqual(self.read(), files['FBOFeed20190501'])
+        self.assertEqual(stats['resumed_from'], 0)
+
+    def test_download_file_stall(self):
+        conditions = Conditions(stall_rate = 1.0, stall_seconds = 3, max_faults = 1)
+        with ftp_stand_in(self.files, conditions) as url:
+            stats = download_file(f'{url}/FBOFeed20190501', self.file_name, self.pool)
+        self.assertEqual(self.read(), self.files['FBOFeed20190501'])
+        self.assertEqual(stats['attempts'], 2)
+
+    def test_list_feed_files(self):
+        with ftp_stand_in(self.files) as url:
+            host, port = url[len('ftp://'):].split(':')
+            result = list_feed_files(host, int(port))
+        self.assertEqual(result, {'20190501': 100000})
+
+    def test_get_email_from_url(self):
+        with http_stand_in() as url:
+            result = get_email_from_url(f'{url}/notice')
+        self.assertEqual(result, ['mailto:foo.bar@gsa.gov'])
+
+    def test_get_email_from_url_error(self):
+        with http_stand_in(Conditions(error_rate = 1.0)) as url:
+            result = get_email_from_url(f'{url}/notice')
+        self.assertEqual(result, [])
+
+    def test_run_scenario(self):
+        result = run_scenario(Conditions(truncate_rate = 1.0, max_faults = 2), n_files = 3, feed_copies = 1,
+                              concurrency = 2, timeout = 2, scrapes_per_file = 1)
+        self.assertEqual(result['ok'], 3)
+        self.assertEqual(result['failed'], 0)
+        self.assertEqual(result['scrapes ok'] + result['scrapes failed'], 3)
+
+    def test_run_scenario_scrape_errors(self):
+        result = run_scenario(Conditions(), n_files = 3, feed_copies = 1, concurrency = 2, timeout = 2,
+                              scrapes_per_file = 1, http_conditions = Conditions(error_rate = 1.0))
+        self.assertEqual(result['ok'], 3)
+        self.assertEqual(result['scrapes ok'], 0)
+        self.assertEqual(result['scrapes failed'], 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__) ) ) )
+from utils.notice import Notice
+from utils.notice_index import notice_hash, load_index, update_index, filter_unseen
+
+
+class NoticeIndexTestCase(unittest.TestCase):
+    '''
+    Test cases for functions in utils/notice_index.py
+    '''
+
+    def setUp(self):
+        self.maxDiff = None
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_notice_hash_is_stable(self):
+        notice = {'AGENCY': 'GSA', 'DESC': 'foo'}
+        reordered = {'DESC': 'foo', 'AGENCY': 'GSA'}
+        self.assertEqual(notice_hash('PRESOL', notice), notice_hash('PRESOL', reordered))
+        self.assertEqual(notice_hash('PRESOL', notice), notice_hash('PRESOL', Notice(notice)))
+        self.assertNotEqual(notice_hash('PRESOL', notice), notice_hash('MOD', notice))
+        self.assertNotEqual(notice_hash('PRESOL', notice), notice_hash('PRESOL', {'AGENCY': 'GSA'}))
+
+    def test_load_and_update_index(self):
+        self.assertIsNone(load_index('20190501', self.tmp_dir.name))
+        update_index('20190501', [], self.tmp_dir.name)
+        self.assertEqual(load_index('20190501', self.tmp_dir.name), set())
+        update_index('20190501', ['a', 'b'], self.tmp_dir.name)
+        update_index('20190501', ['c'], self.tmp_dir.name)
+        self.assertEqual(load_index('20190501', self.tmp_dir.name), {'a', 'b', 'c'})
+
+    def test_filter_unseen(self):
+        data = {'PRESOL': [{'AGENCY': 'GSA'}, {'AGENCY': 'DOD'}], 'MOD': []}
+        seen = {notice_hash('PRESOL', {'AGENCY': 'GSA'})}
+        result, hashes = filter_unseen(data, seen)
+        expected = {'PRESOL': [{'AGENCY': 'DOD'}], 'MOD': []}
+        self.assertEqual(result, expected)
+        self.assertEqual(hashes, [notice_hash('PRESOL', {'AGENCY': 'DOD'})])
+
+if __name__ == '__main__':
+    unittest.main()
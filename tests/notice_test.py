@@ -0,0 +1,64 @@
+import json
+import os
+import pickle
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__) ) ) )
+from utils.notice import Notice, to_json_default, notice_object_hook
+from utils.get_nightly_data import pseudo_xml_to_json
+from fixtures.nightly_file import nightly_file
+from fixtures import pseudo_xml_to_json_expected
+
+
+class NoticeTestCase(unittest.TestCase):
+    '''
+    Test cases for utils/notice.py
+    '''
+
+    def setUp(self):
+        self.maxDiff = None
+        self.data = {'AGENCY': 'General Services Administration', 'SUBJECT': 'TBM', 'DESC': 'foo'}
+
+    def tearDown(self):
+        pass
+
+    def test_notice_mapping(self):
+        notice = Notice(self.data)
+        self.assertEqual(notice, self.data)
+        self.assertEqual(list(notice), ['AGENCY', 'SUBJECT', 'DESC'])
+        self.assertEqual(notice.get('NAICS', ''), '')
+        self.assertEqual(notice.pop('SUBJECT'), 'TBM')
+        notice['EMAIL'] = 'foo@gsa.gov'
+        self.assertEqual(notice, {'AGENCY': 'General Services Administration', 'DESC': 'foo', 
+                                  'EMAIL': 'foo@gsa.gov'})
+
+    def test_notice_shares_keys_and_values(self):
+        first = Notice(self.data)
+        second = Notice({k: ''.join(v) for k, v in self.data.items()})
+        self.assertIs(first._table, second._table)
+        self.assertIs(first['AGENCY'], second['AGENCY'])
+
+    def test_notice_json(self):
+        data = {'PRESOL': [Notice(self.data)]}
+        result = json.dumps(data, default = to_json_default)
+        expected = json.dumps({'PRESOL': [self.data]})
+        self.assertEqual(result, expected)
+        loaded = json.loads(result, object_pairs_hook = notice_object_hook)
+        self.assertIsInstance(loaded['PRESOL'][0], Notice)
+        self.assertEqual(loaded, {'PRESOL': [self.data]})
+
+    def test_notice_pickle(self):
+        notice = Notice(self.data)
+        result = pickle.loads(pickle.dumps(notice))
+        self.assertEqual(result, notice)
+        self.assertIs(result._table, notice._table)
+
+    def test_pseudo_xml_to_json_compact(self):
+        result = pseudo_xml_to_json(nightly_file, compact = True)
+        expected = pseudo_xml_to_json_expected.merge_notices_dict
+        self.assertIsInstance(result['PRESOL'][0], Notice)
+        self.assertEqual(result, expected)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import csv
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__) ) ) )
+from utils.rollups import (ROLLUP_DIMENSIONS, empty_rollups, load_rollups, query_rollup,
+                           rebuild_rollups, save_rollups, top_values, update_rollups)
+from utils.writer import write_to_csv
+from utils.ndjson import write_ndjson
+
+
+class RollupsTestCase(unittest.TestCase):
+    '''
+    Test cases for functions in utils/rollups.py
+    '''
+
+    def setUp(self):
+        self.maxDiff = None
+        self.rows = [{'fbo date': '20190501', 'notice type': 'PRESOL', 'AGENCY': 'Army', 'NAICS': '541512'},
+                     {'fbo date': '20190501', 'notice type': 'MOD', 'AGENCY': 'Navy', 'SETASIDE': 'N/A'},
+                     {'fbo date': '20190502', 'notice type': 'PRESOL', 'AGENCY': 'Army', 'NAICS': '541512'},
+                     {'fbo date': '20190508', 'notice type': 'COMBINE', 'AGENCY': 'Army', 'NAICS': float('nan')},
+                     {'fbo date': '20190601', 'notice type': 'NA'}]
+        self.rollups = update_rollups(empty_rollups(), self.rows)
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp_dir.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp_dir.cleanup()
+
+    def test_update_rollups(self):
+        self.assertEqual(self.rollups['dates'], {'20190501': 2, '20190502': 1, '20190508': 1, '20190601': 0})
+        self.assertEqual(self.rollups['totals']['AGENCY'], {'Army': 3, 'Navy': 1})
+        self.assertEqual(self.rollups['totals']['NAICS'], {'541512': 2})
+        self.assertEqual(self.rollups['by_date']['notice type']['20190501'], {'PRESOL': 1, 'MOD': 1})
+
+    def test_query_rollup_totals(self):
+        result = query_rollup(self.rollups, 'notice type')
+        expected = {'PRESOL': 2, 'MOD': 1, 'COMBINE': 1}
+        self.assertEqual(result, expected)
+
+    def test_query_rollup_range(self):
+        result = query_rollup(self.rollups, 'AGENCY', start = '20190502', end = '20190531')
+        self.assertEqual(result, {'Army': 2})
+        result = query_rollup(self.rollups, 'AGENCY', end = '20190501')
+        self.assertEqual(result, {'Army': 1, 'Navy': 1})
+
+    def test_query_rollup_period(self):
+        result = query_rollup(self.rollups, 'AGENCY', period = 'week')
+        expected = {'20190429': {'Army': 2, 'Navy': 1}, '20190506': {'Army': 1}}
+        self.assertEqual(result, expected)
+        result = query_rollup(self.rollups, 'fbo date', period = 'month')
+        self.assertEqual(result, {'201905': 4, '201906': 0})
+
+    def test_query_rollup_stored_periods(self):
+        #the stored per-period counts match the ones added up from the days in the range
+        for dimension in ('fbo date',) + ROLLUP_DIMENSIONS:
+            for period in ('day', 'week', 'month'):
+                result = query_rollup(self.rollups, dimension, period = period)
+                expected = query_rollup(self.rollups, dimension, start = '20190101', end = '20191231',
+                                        period = period)
+                self.assertEqual(result, expected)
+
+    def test_load_rollups_without_periods(self):
+        #rollups saved before the per-period counts were kept
+        save_rollups({k: self.rollups[k] for k in ('dates', 'by_date', 'totals')})
+        result = load_rollups()
+        self.assertEqual(result, self.rollups)
+
+    def test_query_rollup_bad_dimension(self):
+        with self.assertRaises(ValueError):
+            query_rollup(self.rollups, 'SUBJECT')
+
+    def test_top_values(self):
+        result = top_values(self.rollups, 'AGENCY', n = 1)
+        self.assertEqual(result, [('Army', 3)])
+
+    def test_save_load_rollups(self):
+        self.assertIsNone(load_rollups())
+        save_rollups(self.rollups)
+        self.assertEqual(load_rollups(), self.rollups)
+
+    def test_rebuild_rollups_long_fields(self):
+        limit = csv.field_size_limit()
+        with open('data.csv', 'w', newline = '') as f:
+            writer = csv.DictWriter(f, ['AGENCY', 'DESC', 'fbo date', 'notice type'])
+            writer.writeheader()
+            writer.writerow({'AGENCY': 'Army', 'DESC': 'a' * (limit + 1), 'fbo date': '20190501',
+                             'notice type': 'PRESOL'})
+        result = rebuild_rollups('data.csv')
+        self.assertEqual(result['totals']['AGENCY'], {'Army': 1})
+        #the process-wide limit is put back
+        self.assertEqual(csv.field_size_limit(), limit)
+
+    def test_write_to_csv_updates_rollups(self):
+        os.makedirs('data')
+        data = {'PRESOL': [{'AGENCY': 'Army', 'NAICS': '541512', 'SUBJECT': 'a'}],
+                'MOD': [{'AGENCY': 'Navy', 'SUBJECT': 'b'}]}
+        write_ndjson(data, os.path.join('data', '20190501.ndjson.gz'))
+        write_to_csv()
+        write_ndjson({'PRESOL': [{'AGENCY': 'Army', 'SUBJECT': 'c'}]},
+                     os.path.join('data', '20190502.ndjson.gz'))
+        write_to_csv()
+        result = load_rollups()
+        #the incrementally maintained rollups match ones rebuilt from data.csv
+        self.assertEqual(result, rebuild_rollups('data.csv'))
+        self.assertEqual(query_rollup(result, 'AGENCY'), {'Army': 2, 'Navy': 1})
+
+if __name__ == '__main__':
+    unittest.main()
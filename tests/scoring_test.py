@@ -0,0 +1,77 @@
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__) ) ) )
+from utils.scoring import compile_terms, term_matrix, score_notices, rank_notices
+from utils.get_nightly_data import tbm_filter
+
+
+class ScoringTestCase(unittest.TestCase):
+    '''
+    Test cases for functions in utils/scoring.py
+    '''
+
+    def setUp(self):
+        self.maxDiff = None
+        self.data = {'PRESOL':[{'DESC':'This is a tbm solicitation.'},
+                               {'DESC':'This is a dltbm solicitation.'},
+                               {'SUBJECT':'Technology Business Management', 'DESC':'Implement the TBM framework.'},
+                               {'DESC':'This is not TBM because tbm means Tactical Ballistic Missile'}],
+                     'MOD':[{'SUBJECT':'Nothing to see here'}]}
+
+    def tearDown(self):
+        pass
+
+    def test_term_matrix(self):
+        terms = ['tbm', 'tbm framework', 'it tower']
+        terms_re, term_index = compile_terms(terms)
+        texts = ['tbm and tbm', 'the tbm framework', '', 'audit tower', 'it tower\ntbm']
+        result = term_matrix(texts, terms_re, term_index).tolist()
+        expected = [[2, 0, 0], [0, 1, 0], [0, 0, 0], [0, 0, 0], [1, 0, 1]]
+        self.assertEqual(result, expected)
+
+    def test_score_notices(self):
+        scores, notices = score_notices(self.data)
+        self.assertEqual(len(scores), 5)
+        self.assertEqual(notices[4], ('MOD', {'SUBJECT':'Nothing to see here'}))
+        self.assertEqual(scores[1], 0)
+        self.assertLess(scores[3], 0)
+        self.assertGreater(scores[2], scores[0])
+
+    def test_rank_notices(self):
+        result = [(notice_type, notice) for _, notice_type, notice in rank_notices(self.data)]
+        expected = [('PRESOL', self.data['PRESOL'][2]), ('PRESOL', self.data['PRESOL'][0])]
+        self.assertEqual(result, expected)
+
+    def test_rank_notices_agrees_with_tbm_filter(self):
+        result = [notice for _, _, notice in rank_notices(self.data, threshold = 0.01)]
+        expected = tbm_filter(self.data)['PRESOL']
+        self.assertCountEqual(result, expected)
+
+    def test_rank_notices_exclude(self):
+        #a single mention of an excluded phrase outweighs any number of TBM terms
+        notice = {'SUBJECT': 'TBM framework - technology business management - IT spending transparency',
+                  'DESC': 'TBM framework, technology business management and TBM towers ' * 10 +
+                          'for the tactical ballistic missile program'}
+        data = {'PRESOL': [notice, {'DESC': 'This is a tbm solicitation.'}]}
+        scores, _ = score_notices(data)
+        self.assertEqual(scores[0], float('-inf'))
+        result = [notice for _, _, notice in rank_notices(data, threshold = float('-inf'))]
+        self.assertEqual(result, [data['PRESOL'][1]])
+        self.assertEqual(tbm_filter(data)['PRESOL'], [data['PRESOL'][1]])
+        #without the exclusion it would rank first
+        result = rank_notices(data, exclude = [])
+        self.assertIs(result[0][2], notice)
+
+    def test_rank_notices_custom_weights(self):
+        result = rank_notices(self.data, threshold = 0.5, weights = {'solicitation': 1.0, 'dltbm': -5.0})
+        self.assertEqual([notice for _, _, notice in result], [self.data['PRESOL'][0]])
+
+    def test_score_notices_empty(self):
+        scores, notices = score_notices({'PRESOL': []})
+        self.assertEqual(len(scores), 0)
+        self.assertEqual(notices, [])
+
+if __name__ == '__main__':
+    unittest.main()
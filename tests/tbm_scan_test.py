@@ -2,9 +2,10 @@ from datetime import datetime, timedelta
 import os
 import sys
 import unittest
+from unittest.mock import patch
 
 sys.path.append( os.path.dirname( os.path.dirname( os.path.abspath(__file__) ) ) )
-from tbm_scan import get_dates
+from tbm_scan import get_dates, main
 
 class EndToEndTest(unittest.TestCase):
 
@@ -26,5 +27,17 @@ class EndToEndTest(unittest.TestCase):
         expected = ['20190501', '20190502', '20190503']
         self.assertCountEqual(result, expected)
 
+    @patch('tbm_scan.write_to_xlsx')
+    @patch('tbm_scan.write_to_csv')
+    @patch('tbm_scan.get_nightly_data')
+    def test_main_single_date_failure(self, mock_get_nightly_data, mock_write_to_csv, mock_write_to_xlsx):
+        #a failed date is logged rather than ending the run, as it is with several dates
+        for error in (SystemExit(1), ValueError('bad feed')):
+            mock_get_nightly_data.side_effect = error
+            with self.assertLogs('tbm_scan', level = 'ERROR'):
+                main(from_jupyter = True, start_date = '2019-05-01', end_date = '2019-05-01',
+                     feed_catalog = False)
+        self.assertEqual(mock_write_to_csv.call_count, 2)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -1,9 +1,11 @@
 import os
 import sys
+import tempfile
 import unittest
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__) ) ) )
-from utils.writer import transform_data
+from utils.ndjson import iter_ndjson, write_ndjson
+from utils.writer import read_ndjson, transform_data
 
 
 class WriterTestCase(unittest.TestCase):
@@ -45,5 +47,19 @@ class WriterTestCase(unittest.TestCase):
                      {'notice type': 'MOD', 'fbo date': '20190501', 'AGENCY': 1, 'b':2}]
         self.assertEqual(result, expected)
 
+    def test_read_ndjson(self):
+        data = {'PRESOL': [{'AGENCY': 'GSA', 'DESC': 'caf\u00e9'}, {'AGENCY': 'DOD'}],
+                'MOD': [],
+                'AWARD': [{'AGENCY': 'GSA'}]}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            ndjson_file = os.path.join(tmp_dir, '20190501-result.ndjson.gz')
+            write_ndjson(data, ndjson_file, compression = 'gzip')
+            result = read_ndjson(ndjson_file)
+            lines = list(iter_ndjson(ndjson_file))
+        expected = {'PRESOL': [{'AGENCY': 'GSA', 'DESC': 'caf\u00e9'}, {'AGENCY': 'DOD'}],
+                    'AWARD': [{'AGENCY': 'GSA'}]}
+        self.assertEqual(result, expected)
+        self.assertEqual(len(lines), 3)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,91 @@
+import csv
+import os
+import sys
+import tempfile
+import unittest
+
+from openpyxl import load_workbook
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__) ) ) )
+from utils.xlsx_writer import EXCEL_MAX_CELL_CHARS, sheet_title, write_to_xlsx
+
+
+class XlsxWriterTestCase(unittest.TestCase):
+    '''
+    Test cases for functions in utils/xlsx_writer.py
+    '''
+
+    def setUp(self):
+        self.maxDiff = None
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.csv_file = os.path.join(self.tmp_dir.name, 'data.csv')
+        self.xlsx_file = os.path.join(self.tmp_dir.name, 'data.xlsx')
+        rows = [{'AGENCY': 'Army', 'DESC': 'a', 'ZIP': '1', 'fbo date': '20190501', 'notice type': 'PRESOL'},
+                {'AGENCY': 'Navy', 'DESC': 'b', 'ZIP': '2', 'fbo date': '20190502', 'notice type': 'MOD'},
+                {'AGENCY': 'Army', 'DESC': 'c', 'ZIP': '', 'fbo date': '20190601', 'notice type': 'PRESOL'},
+                {'AGENCY': 'Army', 'DESC': 'd', 'ZIP': '4', 'fbo date': '20190602', 'notice type': 'PRESOL'},
+                {'fbo date': '20190603', 'notice type': 'NA'}]
+        self.write_csv(rows)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write_csv(self, rows):
+        with open(self.csv_file, 'w', newline = '') as f:
+            writer = csv.DictWriter(f, ['AGENCY', 'DESC', 'ZIP', 'fbo date', 'notice type'])
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def read_xlsx(self):
+        wb = load_workbook(self.xlsx_file)
+        return {ws.title: [list(row) for row in ws.iter_rows(values_only = True)] for ws in wb}
+
+    def test_write_to_xlsx_by_type(self):
+        result = write_to_xlsx(csv_file = self.csv_file, xlsx_file = self.xlsx_file)
+        self.assertEqual(result, {'PRESOL': 3, 'MOD': 1})
+        sheets = self.read_xlsx()
+        header = ['notice type', 'fbo date', 'AGENCY', 'DESC', 'ZIP']
+        self.assertEqual(sheets['MOD'], [header, ['MOD', '20190502', 'Navy', 'b', '2']])
+        self.assertEqual(sheets['PRESOL'][2], ['PRESOL', '20190601', 'Army', 'c', None])
+
+    def test_write_to_xlsx_by_month(self):
+        result = write_to_xlsx(sheet_by = 'month', csv_file = self.csv_file, xlsx_file = self.xlsx_file)
+        self.assertEqual(result, {'2019-05': 2, '2019-06': 2})
+
+    def test_write_to_xlsx_field_filter(self):
+        write_to_xlsx(field_filter = True, csv_file = self.csv_file, xlsx_file = self.xlsx_file)
+        sheets = self.read_xlsx()
+        self.assertEqual(sheets['MOD'][0], ['notice type', 'fbo date', 'AGENCY', 'DESC'])
+
+    def test_write_to_xlsx_rollover(self):
+        result = write_to_xlsx(csv_file = self.csv_file, xlsx_file = self.xlsx_file, max_rows = 3)
+        self.assertEqual(result, {'PRESOL': 2, 'MOD': 1, 'PRESOL (2)': 1})
+        sheets = self.read_xlsx()
+        self.assertEqual(len(sheets['PRESOL']), 3)
+        self.assertEqual(sheets['PRESOL (2)'][1][3], 'd')
+
+    def test_write_to_xlsx_cleans_cells(self):
+        rows = [{'AGENCY': '=HYPERLINK("x")', 'DESC': 'a\x01b' + 'c' * EXCEL_MAX_CELL_CHARS,
+                 'fbo date': '20190501', 'notice type': 'PRESOL'}]
+        self.write_csv(rows)
+        write_to_xlsx(csv_file = self.csv_file, xlsx_file = self.xlsx_file)
+        row = self.read_xlsx()['PRESOL'][1]
+        self.assertEqual(row[2], '=HYPERLINK("x")')
+        self.assertEqual(len(row[3]), EXCEL_MAX_CELL_CHARS)
+        self.assertTrue(row[3].startswith('abc'))
+
+    def test_write_to_xlsx_long_fields(self):
+        limit = csv.field_size_limit()
+        rows = [{'AGENCY': 'Army', 'DESC': 'a' * (limit + 1), 'fbo date': '20190501', 'notice type': 'PRESOL'}]
+        self.write_csv(rows)
+        write_to_xlsx(csv_file = self.csv_file, xlsx_file = self.xlsx_file)
+        self.assertEqual(len(self.read_xlsx()['PRESOL'][1][3]), min(limit + 1, EXCEL_MAX_CELL_CHARS))
+        #the process-wide limit is put back
+        self.assertEqual(csv.field_size_limit(), limit)
+
+    def test_sheet_title(self):
+        self.assertEqual(sheet_title('A/B', 1), 'AB')
+        self.assertEqual(sheet_title('X' * 40, 12), 'X' * 26 + ' (12)')
+
+if __name__ == '__main__':
+    unittest.main()
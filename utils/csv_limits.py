@@ -0,0 +1,15 @@
+from contextlib import contextmanager
+import csv
+
+
+@contextmanager
+def large_csv_fields(limit = 2**31 - 1):
+    '''
+    Raise the csv module's field size limit, which notice descriptions can exceed, and put it
+    back afterwards since the limit applies to the whole process.
+    '''
+    old_limit = csv.field_size_limit(limit)
+    try:
+        yield
+    finally:
+        csv.field_size_limit(old_limit)
@@ -0,0 +1,153 @@
+from datetime import datetime, timedelta
+import ftplib
+import json
+import logging
+import os
+import re
+
+from utils.ftp_client import get_session_pool
+
+logger = logging.getLogger(__name__)
+
+FBO_FTP_HOST = 'ftp.fbo.gov'
+#how long a cached listing of the FTP server is trusted before it's fetched again
+CATALOG_REFRESH_INTERVAL = timedelta(hours = 6)
+FEED_FILE_RE = re.compile(r'^FBOFeed(\d{8})$')
+
+
+def parse_list_line(line):
+    '''
+    Parse a line of an FTP LIST response in either the unix ("ls -l") or DOS format.
+    Parameters:
+        line (str): a line of the response
+    Returns:
+        (name, size) (tuple): the file name and its size in bytes, or None if the line can't be parsed
+    '''
+    parts = line.split(None, 8)
+    if len(parts) == 9 and parts[4].isdigit():
+        #-rw-r--r--   1 ftp  ftp  3452101 Feb 03  2019 FBOFeed20190203
+        return parts[8], int(parts[4])
+    parts = line.split(None, 3)
+    if len(parts) == 4 and parts[2].isdigit():
+        #02-03-19  11:59PM  3452101 FBOFeed20190203
+        return parts[3], int(parts[2])
+
+
+def list_feed_files(host = FBO_FTP_HOST, port = 21):
+    '''
+    Get the nightly files on the FBO FTP server and their sizes with a single directory listing.
+    The listing uses a pooled session, which the downloads can then reuse.
+    Parameters:
+        host (str): the FTP host
+        port (int): the FTP port
+    Returns:
+        catalog (dict): the "%Y%m%d" dates with a nightly file as keys and their sizes in bytes as values
+    '''
+    with get_session_pool().session(host, port) as ftp:
+        try:
+            entries = [(name, facts.get('size')) for name, facts in ftp.mlsd(facts = ['size'])]
+        except ftplib.error_perm:
+            #the server doesn't support MLSD, so fall back to parsing LIST
+            lines = []
+            ftp.retrlines('LIST', lines.append)
+            entries = [entry for entry in map(parse_list_line, lines) if entry]
+    catalog = {}
+    for name, size in entries:
+        m = FEED_FILE_RE.match(name)
+        if m and size is not None:
+            catalog[m.group(1)] = int(size)
+
+    return catalog
+
+
+def load_catalog(catalog_file):
+    '''
+    Return the catalog cached in catalog_file or None if there isn't one or it can't be read,
+    e.g. because a run was killed while writing it.
+    '''
+    try:
+        with open(catalog_file, 'r') as f:
+            cached = json.load(f)
+        datetime.strptime(cached['fetched_at'], "%Y-%m-%dT%H:%M:%S")
+        if not isinstance(cached['files'], dict):
+            raise TypeError("'files' isn't a dict")
+    except FileNotFoundError:
+        return
+    except (OSError, ValueError, KeyError, TypeError) as err:
+        logger.warning(f"Ignoring the unreadable feed catalog cache {catalog_file} ({err})")
+        return
+
+    return cached
+
+
+def save_catalog(cached, catalog_file):
+    '''
+    Cache the catalog in catalog_file. The file is replaced in one step so that a run killed
+    while writing it never leaves a truncated cache behind.
+    '''
+    os.makedirs(os.path.dirname(catalog_file), exist_ok = True)
+    tmp_file_name = catalog_file + '.tmp'
+    with open(tmp_file_name, 'w') as f:
+        json.dump(cached, f)
+    os.replace(tmp_file_name, catalog_file)
+
+
+def get_feed_catalog(catalog_file = None, refresh_interval = CATALOG_REFRESH_INTERVAL,
+                     newest_date = None, host = FBO_FTP_HOST):
+    '''
+    Return the catalog of nightly files on the FBO FTP server, using a copy cached on disk if it's
+    fresh enough.
+    Parameters:
+        catalog_file (None or str): where to cache the catalog. Defaults to temp/feed_catalog.json
+        refresh_interval (timedelta): how old the cache can be before the server is listed again
+        newest_date (None or str): a "%Y%m%d" date that's about to be scanned. If it's newer than
+                                   everything in the cache, the server is listed again.
+        host (str): the FTP host
+    Returns:
+        catalog (dict): see list_feed_files(). None if the server can't be listed and there's no cache.
+    '''
+    if not catalog_file:
+        catalog_file = os.path.join(os.getcwd(), 'temp', 'feed_catalog.json')
+    cached = load_catalog(catalog_file)
+    if cached:
+        fetched_at = datetime.strptime(cached['fetched_at'], "%Y-%m-%dT%H:%M:%S")
+        is_fresh = datetime.utcnow() - fetched_at < refresh_interval
+        is_complete = not newest_date or newest_date <= max(cached['files'], default = '')
+        if is_fresh and is_complete:
+            return cached['files']
+    try:
+        catalog = list_feed_files(host)
+    except (OSError, EOFError, ftplib.Error) as err:
+        if cached:
+            logger.warning(f"Couldn't list {host} ({err}). Using the catalog cached at {cached['fetched_at']}")
+            return cached['files']
+        logger.warning(f"Couldn't list {host}: {err}")
+        return
+    if not catalog:
+        #an empty listing is more likely a problem with the server than a lack of files
+        logger.warning(f"Didn't find any nightly files on {host}")
+        return cached['files'] if cached else None
+    save_catalog({'fetched_at': datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S"),
+                  'files': catalog}, catalog_file)
+
+    return catalog
+
+
+def plan_dates(fbo_dates, catalog):
+    '''
+    Drop the dates that don't have a nightly file and order the rest largest-first, so the biggest
+    files start first and the workers finish at about the same time.
+    Parameters:
+        fbo_dates (list): dates as strings in the "%Y%m%d" format
+        catalog (None or dict): see get_feed_catalog(). If None, fbo_dates is returned as is.
+    Returns:
+        fbo_dates (list): dates as strings in the "%Y%m%d" format
+    '''
+    if catalog is None:
+        return fbo_dates
+    missing = [date for date in fbo_dates if date not in catalog]
+    if missing:
+        logger.info(f"Skipping {len(missing)} date(s) without a nightly file: {', '.join(missing)}")
+    planned = [date for date in fbo_dates if date in catalog]
+
+    return sorted(planned, key = lambda date: catalog[date], reverse = True)
@@ -0,0 +1,219 @@
+from contextlib import contextmanager
+import ftplib
+import json
+import logging
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+#errors worth retrying (with REST to resume) as opposed to, say, a missing file
+TRANSIENT_ERRORS = (OSError, EOFError, ftplib.error_temp, ftplib.error_reply, ftplib.error_proto)
+
+
+class FTPSessionPool:
+    '''
+    A small pool of logged-in FTP sessions, keyed by host and port, so that consecutive downloads
+    skip connecting, logging in and setting the transfer type. Sessions can't be shared across
+    processes, so each process (e.g. each ProcessPoolExecutor worker) gets its own pool via
+    get_session_pool() and reuses it for every date it handles.
+    '''
+
+    def __init__(self, max_sessions = 2, timeout = 20, user = 'anonymous', passwd = ''):
+        '''
+        Parameters:
+            max_sessions (int): the number of idle sessions to keep per host
+            timeout (int): the socket timeout in seconds
+            user (str): the FTP user
+            passwd (str): the FTP password
+        '''
+        self.max_sessions = max_sessions
+        self.timeout = timeout
+        self.user = user
+        self.passwd = passwd
+        self._idle = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _connect(self, host, port):
+        ftp = ftplib.FTP(timeout = self.timeout)
+        ftp.connect(host, port)
+        ftp.login(self.user, self.passwd)
+        ftp.voidcmd('TYPE I')
+
+        return ftp
+
+    def _checkout(self, host, port):
+        with self._lock:
+            if self._pid != os.getpid():
+                #the pool was inherited by a forked process, whose parent still owns the sessions
+                self._idle = {}
+                self._pid = os.getpid()
+            idle = self._idle.setdefault((host, port), [])
+            ftp = idle.pop() if idle else None
+        if ftp:
+            try:
+                ftp.voidcmd('NOOP')
+                return ftp
+            except TRANSIENT_ERRORS:
+                #the server dropped the idle session
+                ftp.close()
+
+        return self._connect(host, port)
+
+    def _checkin(self, host, port, ftp):
+        with self._lock:
+            idle = self._idle.setdefault((host, port), [])
+            if len(idle) < self.max_sessions:
+                idle.append(ftp)
+                return
+        ftp.close()
+
+    @contextmanager
+    def session(self, host, port = 21):
+        '''
+        Borrow a logged-in session. It goes back to the pool afterwards unless an error was raised,
+        in which case it's closed since its state is unknown.
+        '''
+        ftp = self._checkout(host, port)
+        try:
+            yield ftp
+        except BaseException:
+            ftp.close()
+            raise
+        self._checkin(host, port, ftp)
+
+    def close(self):
+        '''
+        Log out of every idle session.
+        '''
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for sessions in idle.values():
+            for ftp in sessions:
+                try:
+                    ftp.quit()
+                except TRANSIENT_ERRORS + (ftplib.error_perm,):
+                    ftp.close()
+
+
+_session_pool = None
+
+
+def get_session_pool():
+    '''
+    Return this process's FTPSessionPool, creating it if need be.
+    '''
+    global _session_pool
+    if _session_pool is None:
+        _session_pool = FTPSessionPool()
+
+    return _session_pool
+
+
+def remote_size(ftp, path):
+    '''
+    Return the size of a remote file in bytes or None if the server doesn't support SIZE.
+    '''
+    try:
+        return ftp.size(path)
+    except ftplib.error_perm:
+        return
+
+
+def remote_mtime(ftp, path):
+    '''
+    Return the modification time of a remote file (e.g. "20190501043000") or None if the server
+    doesn't support MDTM.
+    '''
+    try:
+        return ftp.sendcmd(f'MDTM {path}').split()[-1]
+    except ftplib.error_perm:
+        return
+
+
+def part_file_name(file_name):
+    '''
+    Return the path of the sidecar file that records which version of the remote file a partial
+    download belongs to.
+    '''
+    return f'{file_name}.part'
+
+
+def load_part_info(file_name):
+    '''
+    Return the remote size and modification time recorded for a partial download or None if
+    there's no (readable) record.
+    '''
+    try:
+        with open(part_file_name(file_name), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return
+
+
+def save_part_info(file_name, version):
+    with open(part_file_name(file_name), 'w') as f:
+        json.dump(version, f)
+
+
+def download_file(url, file_name, pool = None, retries = 2):
+    '''
+    Download a file over FTP with a pooled session. If file_name already holds part of the file,
+    e.g. from an interrupted transfer, only the rest is fetched (using REST). A partial file is
+    only resumed if the remote file's size and modification time match the ones recorded in its
+    .part sidecar when it was started; otherwise it's downloaded again from the start.
+    Parameters:
+        url (str): an ftp:// url
+        file_name (str): where to save the file
+        pool (None or FTPSessionPool): defaults to get_session_pool()
+        retries (int): the number of times to resume after a transient error
+    Returns:
+        stats (dict): the bytes transferred, the seconds it took, the rate in bytes per second,
+                      the offset the transfer resumed from and the number of attempts
+    '''
+    pool = pool or get_session_pool()
+    parsed = urlparse(url)
+    host, port, path = parsed.hostname, parsed.port or 21, parsed.path.lstrip('/')
+    start = time.monotonic()
+    resumed_from = os.path.getsize(file_name) if os.path.exists(file_name) else 0
+    for attempt in range(1, retries + 2):
+        try:
+            with pool.session(host, port) as ftp:
+                version = {'size': remote_size(ftp, path), 'modified': remote_mtime(ftp, path)}
+                expected = version['size']
+                with open(file_name, 'ab') as f:
+                    offset = f.tell()
+                    stale = (load_part_info(file_name) != version or
+                             (expected is not None and offset > expected))
+                    if offset and (stale or version == {'size': None, 'modified': None}):
+                        #the partial file is from another version of the remote file (or
+                        #there's no telling), so start over
+                        f.truncate(0)
+                        f.seek(0)
+                        offset = resumed_from = 0
+                    save_part_info(file_name, version)
+                    if expected is None or offset < expected:
+                        ftp.retrbinary(f'RETR {path}', f.write, rest = offset or None)
+                    size = f.tell()
+            if expected is not None and size < expected:
+                raise EOFError(f"transfer of {url} ended at {size} of {expected} bytes")
+            os.remove(part_file_name(file_name))
+            break
+        except TRANSIENT_ERRORS as err:
+            if attempt > retries:
+                raise
+            logger.warning(f"Attempt {attempt} to download {url} failed ({err}). Resuming.")
+    seconds = time.monotonic() - start
+    transferred = size - resumed_from
+    stats = {'bytes': transferred,
+             'seconds': seconds,
+             'rate': transferred / seconds if seconds else 0.0,
+             'resumed_from': resumed_from,
+             'attempts': attempt}
+    logger.info(f"Downloaded {url}: {transferred} bytes in {seconds:.1f}s "
+                f"({stats['rate'] / 1e6:.2f} MB/s, {attempt} attempt(s))")
+
+    return stats
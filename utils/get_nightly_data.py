@@ -1,22 +1,74 @@
 #!/usr/bin/env python3
 from collections import Counter
-from contextlib import closing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
+from functools import partial
 import json
+import locale
 import logging
+import mmap
 import os
 import re
-import shutil
 import sys
-import urllib.request
 import warnings
 
 from bs4 import BeautifulSoup
 import requests
 
+from utils.ftp_client import download_file
+from utils.lru import LRUCache, stats_delta
+from utils.ndjson import COMPRESSION_EXTENSIONS, write_ndjson
+from utils.notice import Notice, to_json_default
+from utils.notice_index import filter_unseen, load_index, notice_hashes
+from utils.writer import read_data_file
+
 warnings.filterwarnings("ignore", category=UserWarning, module='bs4')
 logger = logging.getLogger(__name__)
 
+HTML_TAGS = ['a', 'abbr', 'acronym', 'address', 'applet', 'area', 'article', 'aside', 'audio', 'b', 'base', 'basefont', 
+             'bdi', 'bdo', 'bgsound', 'big', 'blink', 'blockquote', 'body', 'br', 'button', 'canvas', 'caption', 'center',
+             'cite', 'code', 'col', 'colgroup', 'command', 'content', 'data', 'datalist', 'dd', 'del', 'details', 'dfn', 
+             'dialog', 'dir', 'div', 'dl', 'dt', 'element', 'em', 'embed', 'fieldset', 'figcaption', 'figure', 'font', 
+             'footer', 'form', 'frame', 'frameset', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'head', 'header', 'hgroup', 'hr', 
+             'html', 'i', 'iframe', 'image', 'img', 'input', 'ins', 'isindex', 'kbd', 'keygen', 'label', 'legend', 'li', 
+             'link', 'listing', 'main', 'map', 'mark', 'marquee', 'math', 'menu', 'menuitem', 'meta', 'meter', 'multicol', 
+             'nav', 'nextid', 'nobr', 'noembed', 'noframes', 'noscript', 'object', 'ol', 'optgroup', 'option', 'output', 
+             'p', 'param', 'picture', 'plaintext', 'pre', 'progress', 'q', 'rb', 'rbc', 'rp', 'rt', 'rtc', 'ruby', 's', 
+             'samp', 'script', 'section', 'select', 'shadow', 'slot', 'small', 'source', 'spacer', 'span', 'strike', 
+             'strong', 'style', 'sub', 'summary', 'sup', 'svg', 'table', 'tbody', 'td', 'template', 'textarea', 'tfoot', 
+             'th', 'thead', 'time', 'title', 'tr', 'track', 'tt', 'u', 'ul', 'var', 'video', 'wbr', 'xmp']
+NOTICE_TYPES = {'PRESOL','SRCSGT','SNOTE','SSALE','COMBINE','AMDCSS',
+                'MOD','AWARD','JA','FAIROPP','ARCHIVE','UNARCHIVE',
+                'ITB','FSTD','EPSUPLOAD','DELETE'}
+HTML_TAG_RE_STR = r'|'.join('(?:</?{0}>)'.format(x) for x in HTML_TAGS)
+NOTICE_TYPE_START_TAG_RE_STR = r'|'.join('(?:<{0}>)'.format(x) for x in NOTICE_TYPES)
+NOTICE_TYPE_END_TAG_RE_STR = r'|'.join('(?:</{0}>)'.format(x) for x in NOTICE_TYPES)
+# returns two groups: the sub-tag as well as the text corresponding to it
+SUB_TAG_GROUPS_RE_STR = r'\<([A-Z]*)\>(.*)'
+
+HTML_TAG_RE = re.compile(HTML_TAG_RE_STR, flags = re.I)
+ALPHAS_RE = re.compile('[^a-zA-Z]')
+NOTICE_TYPE_START_TAG_RE = re.compile(NOTICE_TYPE_START_TAG_RE_STR)
+NOTICE_TYPE_END_TAG_RE = re.compile(NOTICE_TYPE_END_TAG_RE_STR)
+SUB_TAG_GROUPS_RE = re.compile(SUB_TAG_GROUPS_RE_STR)
+
+#bytes versions of the above for parsing the raw file. All of the tags are ascii.
+HTML_TAG_RE_B = re.compile(HTML_TAG_RE_STR.encode('ascii'), flags = re.I)
+ALPHAS_RE_B = re.compile(b'[^a-zA-Z]')
+NOTICE_TYPE_START_TAG_RE_B = re.compile(NOTICE_TYPE_START_TAG_RE_STR.encode('ascii'))
+NOTICE_TYPE_END_TAG_RE_B = re.compile(NOTICE_TYPE_END_TAG_RE_STR.encode('ascii'))
+SUB_TAG_GROUPS_RE_B = re.compile(SUB_TAG_GROUPS_RE_STR.encode('ascii'))
+END_TAG_RE_B = re.compile(rb'\</[A-Z]*>')
+#matches tokens that are entirely an email address, i.e. bounded by whitespace or the ends of the string
+EMAIL_RE = re.compile(r'(?<!\S)[0-9a-zA-Z](?:[-.\w]*[0-9a-zA-Z])?@(?:[0-9a-zA-Z][-\w]*[0-9a-zA-Z]\.)+[a-zA-Z]{2,9}(?!\S)')
+#much of a nightly file is boilerplate (addresses, set-aside text, standard paragraphs) that
+#repeats across notices, so the cleaned text of each line is cached, per process
+CLEAN_LINE_CACHE = LRUCache(max_entries = 100000, max_bytes = 64 * 1024 * 1024)
+#split a feed into more chunks than workers so a few long notices don't leave workers idle
+CHUNKS_PER_WORKER = 4
+#download_from_ftp() reads the file in text mode, which uses the locale's encoding
+FEED_ENCODING = locale.getpreferredencoding(False)
+
 def make_outpath(target_dir):
     """Make a directory in the root of the project for the downloaded notices.
     
@@ -60,16 +112,24 @@ def clean_line_text(line_text):
     
     return text
 
-def get_email_from_url(url):
+def cached_clean_line_text(line_text):
+    '''
+    clean_line_text(), memoized with CLEAN_LINE_CACHE
+    '''
+    return CLEAN_LINE_CACHE.get_or_compute(line_text, clean_line_text)
+
+
+def get_email_from_url(url, timeout = 20):
     '''
     Given the url to an fbo page, extract the contact email
     Parameters:
         url (str): the url to an fbo page
+        timeout (int): the timeout of the request in seconds
     Returns:
         hrefs (list): a list of all of the hrefs scraped from the page
     '''
     try:
-        r = requests.get(url, timeout=20)
+        r = requests.get(url, timeout=timeout)
     except:
         return
     content = r.content
@@ -80,26 +140,55 @@ def get_email_from_url(url):
     
     return hrefs
 
-def extract_emails(notice):
+def find_emails(text, cache = None):
+    '''
+    Find every whitespace-delimited token in text that's an email address with a single pass of
+    EMAIL_RE.
+    Parameters:
+        text (str): the text of a notice field
+        cache (None or dict): maps text that's already been scanned to the emails found in it
+    Returns:
+        emails (list): the email addresses in the order they appear. Don't mutate this list
+                       since it may be shared via the cache.
+    '''
+    if cache is not None and text in cache:
+        return cache[text]
+    emails = EMAIL_RE.findall(text)
+    if cache is not None:
+        cache[text] = emails
+
+    return emails
+
+
+def normalize_emails(emails):
+    '''
+    Lowercase a list of email addresses and drop the duplicates, keeping the first occurrence.
+    Returns None if there aren't any.
+    '''
+    emails = list(dict.fromkeys(email.lower() for email in emails))
+
+    return emails if emails else None
+
+
+def extract_emails(notice, cache = None, scrape = True):
     '''
     Given a contact field from a notice, extract the email addresses and first contact name.
     
     Parameters:
         notice (dict): a dict representing a single fbo notice from their FTP
+        cache (None or dict): passed to find_emails() so that fields are only scanned once, even
+                              across notices
+        scrape (bool): whether or not to scrape the notice's fbo page as a last resort
         
     Returns:
         emails (list): a list of unique email addresses
     '''
-    email_re = re.compile(r'^([0-9a-zA-Z]([-.\w]*[0-9a-zA-Z])*@([0-9a-zA-Z][-\w]*[0-9a-zA-Z]\.)+[a-zA-Z]{2,9})$')
+    cache = {} if cache is None else cache
     emails = []
     #search the contact field first
     contact = notice.get('CONTACT')
     if contact:
-        tokens = contact.split()
-        for token in tokens:
-            m = re.search(email_re, token)
-            if m:
-                emails.append(m.group())
+        emails = find_emails(contact, cache)
     #If there's no email address, the notice might have an email field, even though 
     #the FBO docs say this field isn't to be used.
     try:
@@ -108,30 +197,40 @@ def extract_emails(notice):
     except KeyError:
         email = None
     if not emails and email:
-        tokens = email.split()
-        for token in tokens:
-            m = re.search(email_re, token)
-            if m:
-                emails.append(m.group())
-    #if there's still no email in the contact field, move onto all of the other fields
+        emails = find_emails(email, cache)
+    #if there's still no email in the contact field, move onto all of the other fields.
+    #the contact field is among them but it's cached, so it isn't scanned again.
     if not emails:
-        notice_values = " ".join(notice.values())
-        tokens = notice_values.split()
-        for token in tokens:
-            m = re.search(email_re, token)
-            if m:
-                emails.append(m.group())
+        emails = [email for value in notice.values() for email in find_emails(value, cache)]
     #if there's still no email address, try web-scraping the notice's fbo page
-    if not emails:
-        url = notice.get('URL')
-        hrefs = get_email_from_url(url)
-        hrefs = [x.replace("mailto:",'') for x in hrefs]
-        if hrefs:
-            matches = [re.search(email_re, href.strip()) for href in hrefs]
-            emails = [m.group() for m in matches if m is not None]
-    emails = [email.lower() for email in set(emails)] if emails else None
+    url = notice.get('URL')
+    if not emails and url and scrape:
+        hrefs = get_email_from_url(url) or []
+        matches = [EMAIL_RE.fullmatch(href.replace("mailto:",'').strip()) for href in hrefs]
+        emails = [m.group() for m in matches if m is not None]
     
-    return emails
+    return normalize_emails(emails)
+
+
+def extract_emails_batch(merge_notices_dict, scrape = True):
+    '''
+    Extract the email addresses of a whole day's notices at once. One cache is shared by every
+    notice, so contact fields and boilerplate that repeat across notices are only scanned once.
+    
+    Parameters:
+        merge_notices_dict (dict): a dictionary with keys for each notice type and arrays of notice
+                                   dicts as values.
+        scrape (bool): whether or not to scrape the fbo page of notices without an email address
+    Returns:
+        emails_dict (dict): a dictionary with keys for each notice type and, as values, arrays with
+                            the result of extract_emails() for each notice, in order.
+    '''
+    cache = {}
+    emails_dict = {}
+    for notice_type, notices in merge_notices_dict.items():
+        emails_dict[notice_type] = [extract_emails(notice, cache, scrape) for notice in notices]
+
+    return emails_dict
 
         
 def id_and_count_notice_tags(file_lines):
@@ -184,29 +283,47 @@ def make_out_path(out_path):
         os.makedirs(out_path)
 
 
-def download_from_ftp(date, fbo_ftp_url):
+def download_feed_file(date, fbo_ftp_url):
     '''
-    Downloads a nightly FBO file, reads the lines, then removes file.
-    Compare to read_from_ftp()
+    Downloads a nightly FBO file to temp/nightly_files without reading it. The transfer rate
+    is logged by utils.ftp_client.download_file().
     
     Parameters:
         date (str): the date of the FTP file being downloaded
         fbo_ftp_url (str): the FBO FTP url
     Returns:
-        file_lines (list): the lines of the nightly file
+        file_name (str): the absolute path to the downloaded file or None if the download failed
     '''
     file_name = f'fbo_nightly_{date}'
     out_path = os.path.join(os.getcwd(),"temp","nightly_files")
     make_out_path(out_path)
+    file_name = os.path.join(out_path,file_name)
     try:
-        with closing(urllib.request.urlopen(fbo_ftp_url, timeout=20)) as r:
-            file_name = os.path.join(out_path,file_name)
-            with open(file_name, 'wb') as f:
-                shutil.copyfileobj(r, f)
+        #a pooled FTP session is reused across dates and a partial file left by a failed
+        #transfer is resumed rather than downloaded again
+        download_file(fbo_ftp_url, file_name)
     except Exception as err:
         logger.critical(f"Exception occurred trying to access {fbo_ftp_url}:  \
                           {err}", exc_info=True)
         return
+
+    return file_name
+
+
+def download_from_ftp(date, fbo_ftp_url):
+    '''
+    Downloads a nightly FBO file, reads the lines, then removes file.
+    Compare to read_from_ftp()
+    
+    Parameters:
+        date (str): the date of the FTP file being downloaded
+        fbo_ftp_url (str): the FBO FTP url
+    Returns:
+        file_lines (list): the lines of the nightly file
+    '''
+    file_name = download_feed_file(date, fbo_ftp_url)
+    if not file_name:
+        return
     with open(file_name,'r', errors='ignore') as f:
         file_lines = f.readlines()
     os.remove(file_name)
@@ -214,39 +331,199 @@ def download_from_ftp(date, fbo_ftp_url):
     return file_lines
 
 
-def pseudo_xml_to_json(file_lines):
+def append_continuation(records, sub_tag, text):
+    '''
+    Append the text of a continuation line (i.e. a line without a sub-tag) to the last record
+    of a notice that holds sub_tag.
+    Parameters:
+        records (list): the {sub_tag: text} dicts parsed so far for a notice
+        sub_tag (str): the last sub-tag seen
+        text (str): the cleaned text of the continuation line
+    '''
+    record_index = 0
+    for i, record in enumerate(records):
+        if sub_tag in record:
+            record_index = i
+    records[record_index][sub_tag] += " " + text
+
+
+def matches_to_notices(matches_dict, compact = False):
+    '''
+    Given a dict of notice types to {notice index: [{sub_tag: text}, ...]} dicts, merge each
+    notice's records into a single dict.
+    Arguments:
+        matches_dict (dict): the records of each notice, by notice type
+        compact (bool): if True, return each notice as a utils.notice.Notice instead of a dict
+    Returns:
+        merge_notices_dict (dict): a dictionary with keys for each notice type and arrays of notice
+                                   dicts as values.
+    '''
+    notices_dict = {k:None for k in NOTICE_TYPES}
+    for k in matches_dict:
+        dict_list = [v for k,v in matches_dict[k].items()]
+        notices_dict[k] = dict_list
+
+    merge_notices_dict = {k:[] for k in notices_dict}
+    for k in notices_dict:
+        notices = notices_dict[k]
+        if notices:
+            for notice in notices:
+                merged_dict = merge_dicts(notice)
+                merge_notices_dict[k].append(Notice(merged_dict) if compact else merged_dict)
+
+    return merge_notices_dict
+
+
+def pick_chunk_boundaries(find_boundary, start, end, n_chunks):
+    '''
+    Pick up to n_chunks - 1 split points so that the chunks are as even as possible. Rather than
+    scanning the whole feed for split points, each one is looked for from an even fraction of the
+    way through, so only the text between there and the next notice boundary is searched.
+    Parameters:
+        find_boundary (function): given a position, returns the first position at or after it that
+                                  the feed can be split at, or None if there isn't one before end
+        start (int): the position of the start of the feed (or the part of it being split)
+        end (int): the position of the end of the feed (or the part of it being split)
+        n_chunks (int): the number of chunks wanted
+    Returns:
+        boundaries (list): the chosen split points, in increasing order
+    '''
+    boundaries = []
+    for k in range(1, n_chunks):
+        target = start + (end - start) * k // n_chunks
+        if boundaries:
+            target = max(target, boundaries[-1] + 1)
+        boundary = find_boundary(target)
+        if boundary is None:
+            break
+        if boundary > start and (not boundaries or boundary > boundaries[-1]):
+            boundaries.append(boundary)
+
+    return boundaries
+
+
+def find_notice_boundary(tagged_lines):
+    '''
+    Return the position of the first line that begins a notice right after another notice's end
+    tag, or None. Chunks only begin there, so any lines between notices stay with the notice
+    before them, just as they do when the whole file is parsed.
+    Parameters:
+        tagged_lines (iterable): (position, is_start_tag, is_end_tag) for each line, in order
+    '''
+    after_end_tag = False
+    for position, is_start_tag, is_end_tag in tagged_lines:
+        if is_start_tag:
+            if after_end_tag:
+                return position
+            after_end_tag = False
+        elif is_end_tag:
+            after_end_tag = True
+
+
+def split_feed_lines(file_lines, n_chunks):
+    '''
+    Split the lines of a nightly file into chunks that can be parsed independently, at notice
+    boundaries (see find_notice_boundary()).
+    Parameters:
+        file_lines (list): A list of lines from the nightly FBO file.
+        n_chunks (int): the maximum number of chunks to return
+    Returns:
+        chunks (list): lists of lines
+    '''
+    def find_boundary(target):
+        return find_notice_boundary((i, NOTICE_TYPE_START_TAG_RE.search(file_lines[i]),
+                                     NOTICE_TYPE_END_TAG_RE.search(file_lines[i]))
+                                    for i in range(target, len(file_lines)))
+    boundaries = pick_chunk_boundaries(find_boundary, 0, len(file_lines), n_chunks)
+    starts = [0] + boundaries
+    ends = boundaries + [len(file_lines)]
+
+    return [file_lines[start:end] for start, end in zip(starts, ends)]
+
+
+def split_feed_bytes(buf, n_chunks, start = 0, end = None):
+    '''
+    The bytes version of split_feed_lines().
+    Parameters:
+        buf (bytes, mmap): the raw contents of a nightly file
+        n_chunks (int): the maximum number of chunks to return
+        start (int): the offset of the first line to split from
+        end (None or int): the offset to split up to. Defaults to len(buf)
+    Returns:
+        chunks (list): (start, end) byte offsets of each chunk
+    '''
+    end = len(buf) if end is None else end
+    def find_boundary(target):
+        #back up to the start of the line that target falls in
+        line_start = max(buf.rfind(b'\n', start, target), buf.rfind(b'\r', start, target)) + 1
+        line_start = max(line_start, start)
+        return find_notice_boundary((line_start, NOTICE_TYPE_START_TAG_RE_B.search(buf, line_start, line_end),
+                                     NOTICE_TYPE_END_TAG_RE_B.search(buf, line_start, line_end))
+                                    for line_start, line_end in iter_line_spans(buf, line_start, end))
+    boundaries = pick_chunk_boundaries(find_boundary, start, end, n_chunks)
+    starts = [start] + boundaries
+    ends = boundaries + [end]
+
+    return list(zip(starts, ends))
+
+
+def call_with_cache_stats(fn, *args, **kwargs):
+    '''
+    Call fn in a worker process and return its result along with the CLEAN_LINE_CACHE hits and
+    misses it caused, so that the parent process can count them with add_worker_cache_stats().
+    '''
+    before = CLEAN_LINE_CACHE.stats()
+    result = fn(*args, **kwargs)
+
+    return result, stats_delta(before, CLEAN_LINE_CACHE.stats())
+
+
+def add_worker_cache_stats(results):
+    '''
+    Add the cache stats from call_with_cache_stats() results to this process's CLEAN_LINE_CACHE.
+    Returns:
+        (list): the results without the stats
+    '''
+    chunks = []
+    for result, stats in results:
+        CLEAN_LINE_CACHE.add_stats(stats)
+        chunks.append(result)
+
+    return chunks
+
+
+def merge_notice_chunks(chunks):
+    '''
+    Given the merge_notices_dicts parsed from consecutive chunks of a nightly file, concatenate
+    their notices by notice type, keeping the order they had in the file.
+    '''
+    merge_notices_dict = {}
+    for chunk in chunks:
+        for notice_type, notices in chunk.items():
+            merge_notices_dict.setdefault(notice_type, []).extend(notices)
+
+    return merge_notices_dict
+
+
+def pseudo_xml_to_json(file_lines, workers = 1, compact = False):
     '''
     Open a nightly file and convert the pseudo-xml to a JSON compatible dictionary
     Arguments:
-        file_name (str): the absolute path to the downloaded file
+        file_lines (list): A list of lines from the nightly FBO file.
+        workers (int): if more than one, split the lines at notice boundaries and parse the chunks
+                       in a pool of this many processes.
+        compact (bool): if True, return each notice as a utils.notice.Notice instead of a dict
     Returns:
         merge_notices_dict (dict): a dictionary with keys for each notice type and arrays of notice
                                    dicts as values.
     '''
-    html_tags = ['a', 'abbr', 'acronym', 'address', 'applet', 'area', 'article', 'aside', 'audio', 'b', 'base', 'basefont', 
-                 'bdi', 'bdo', 'bgsound', 'big', 'blink', 'blockquote', 'body', 'br', 'button', 'canvas', 'caption', 'center',
-                 'cite', 'code', 'col', 'colgroup', 'command', 'content', 'data', 'datalist', 'dd', 'del', 'details', 'dfn', 
-                 'dialog', 'dir', 'div', 'dl', 'dt', 'element', 'em', 'embed', 'fieldset', 'figcaption', 'figure', 'font', 
-                 'footer', 'form', 'frame', 'frameset', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'head', 'header', 'hgroup', 'hr', 
-                 'html', 'i', 'iframe', 'image', 'img', 'input', 'ins', 'isindex', 'kbd', 'keygen', 'label', 'legend', 'li', 
-                 'link', 'listing', 'main', 'map', 'mark', 'marquee', 'math', 'menu', 'menuitem', 'meta', 'meter', 'multicol', 
-                 'nav', 'nextid', 'nobr', 'noembed', 'noframes', 'noscript', 'object', 'ol', 'optgroup', 'option', 'output', 
-                 'p', 'param', 'picture', 'plaintext', 'pre', 'progress', 'q', 'rb', 'rbc', 'rp', 'rt', 'rtc', 'ruby', 's', 
-                 'samp', 'script', 'section', 'select', 'shadow', 'slot', 'small', 'source', 'spacer', 'span', 'strike', 
-                 'strong', 'style', 'sub', 'summary', 'sup', 'svg', 'table', 'tbody', 'td', 'template', 'textarea', 'tfoot', 
-                 'th', 'thead', 'time', 'title', 'tr', 'track', 'tt', 'u', 'ul', 'var', 'video', 'wbr', 'xmp']
-    html_tag_re = re.compile(r'|'.join('(?:</?{0}>)'.format(x) for x in html_tags), flags = re.I)
-    alphas_re = re.compile('[^a-zA-Z]')
-    notice_types = {'PRESOL','SRCSGT','SNOTE','SSALE','COMBINE','AMDCSS',
-                    'MOD','AWARD','JA','FAIROPP','ARCHIVE','UNARCHIVE',
-                    'ITB','FSTD','EPSUPLOAD','DELETE'}
-    notice_type_start_tag_re = re.compile(r'|'.join('(?:<{0}>)'.\
-                                          format(x) for x in notice_types))
-    notice_type_end_tag_re = re.compile(r'|'.join('(?:</{0}>)'.\
-                                        format(x) for x in notice_types))
-    # returns two groups: the sub-tag as well as the text corresponding to it
-    sub_tag_groups = re.compile(r'\<([A-Z]*)\>(.*)')
-    notices_dict_incrementer = {k:0 for k in notice_types}
+    if workers > 1:
+        chunks = split_feed_lines(file_lines, workers * CHUNKS_PER_WORKER)
+        if len(chunks) > 1:
+            with ProcessPoolExecutor(max_workers = workers) as executor:
+                fn = partial(call_with_cache_stats, pseudo_xml_to_json, compact = compact)
+                return merge_notice_chunks(add_worker_cache_stats(executor.map(fn, chunks)))
+    notices_dict_incrementer = {k:0 for k in NOTICE_TYPES}
     tag_count = id_and_count_notice_tags(file_lines)
     matches_dict = {k:{k:[] for k in range(v)} for k,v in tag_count.items()}
     # Loop through each line searching for start-tags, then end-tags, then
@@ -257,61 +534,234 @@ def pseudo_xml_to_json(file_lines):
     for line in file_lines:
         line = line.replace("<br />",' ')
         try:
-            match = notice_type_start_tag_re.search(line)
+            match = NOTICE_TYPE_START_TAG_RE.search(line)
             m = match.group()
-            clean_notice_start_tag = alphas_re.sub('', m)
+            clean_notice_start_tag = ALPHAS_RE.sub('', m)
             last_clean_notice_start_tag = clean_notice_start_tag
         except AttributeError:
             try:
-                match = notice_type_end_tag_re.search(line)
+                match = NOTICE_TYPE_END_TAG_RE.search(line)
                 m = match.group()
                 notices_dict_incrementer[last_clean_notice_start_tag] += 1
                 continue #continue since we found an ending notice tag
             except AttributeError:
-                line_htmless = ' '.join(html_tag_re.sub(' ',
+                line_htmless = ' '.join(HTML_TAG_RE.sub(' ',
                                                         line.replace(u'\xa0', u' ')).split())
                 try:
-                    matches = sub_tag_groups.search(line_htmless)
+                    matches = SUB_TAG_GROUPS_RE.search(line_htmless)
                     groups  = matches.groups()
                     sub_tag = groups[0]
                     last_sub_tab = sub_tag
-                    sub_tag_text = clean_line_text(groups[1])
+                    sub_tag_text = cached_clean_line_text(groups[1])
                     current_tag_index = notices_dict_incrementer[last_clean_notice_start_tag]
                     matches_dict[last_clean_notice_start_tag][current_tag_index].append({sub_tag:sub_tag_text})
                 except AttributeError:
-                    record_index = 0
-                    for i, record in enumerate(matches_dict[last_clean_notice_start_tag][current_tag_index]):
-                        if last_sub_tab in record:
-                            record_index = i
-                    matches_dict[last_clean_notice_start_tag][current_tag_index][record_index][last_sub_tab] += " " + clean_line_text(line_htmless)
-    notices_dict = {k:None for k in notice_types}
-    for k in matches_dict:
-        dict_list = [v for k,v in matches_dict[k].items()]
-        notices_dict[k] = dict_list
+                    records = matches_dict[last_clean_notice_start_tag][current_tag_index]
+                    append_continuation(records, last_sub_tab, cached_clean_line_text(line_htmless))
 
-    merge_notices_dict = {k:[] for k in notices_dict}
-    for k in notices_dict:
-        notices = notices_dict[k]
-        if notices:
-            for notice in notices:
-                merged_dict = merge_dicts(notice)
-                merge_notices_dict[k].append(merged_dict)
+    return matches_to_notices(matches_dict, compact)
+
+
+def iter_line_spans(buf, start = 0, end = None):
+    '''
+    Find the lines in a bytes-like object the same way a file opened in text mode would
+    (i.e. universal newlines), without copying them.
+    Parameters:
+        buf (bytes, mmap): the raw contents of a nightly file
+        start (int): the offset to start at
+        end (None or int): the offset to stop at. Defaults to len(buf)
+    Yields:
+        (line_start, line_end) offsets of each line, excluding its line terminator
+    '''
+    end = len(buf) if end is None else end
+    pos = start
+    while pos < end:
+        nl = buf.find(b'\n', pos, end)
+        next_pos = end if nl == -1 else nl + 1
+        line_end = end if nl == -1 else nl
+        if line_end > pos and buf[line_end - 1:line_end] == b'\r':
+            line_end -= 1
+        cr = buf.find(b'\r', pos, line_end)
+        while cr != -1:
+            #a lone carriage return is also a line break in text mode
+            yield pos, cr
+            pos = cr + 1
+            cr = buf.find(b'\r', pos, line_end)
+        yield pos, line_end
+        pos = next_pos
+
+
+def decode_field(raw, keep_leading_space = False):
+    '''
+    Decode the raw bytes of a field and collapse its whitespace.
+    Parameters:
+        raw (bytes): the field's bytes, with html tags already stripped
+        keep_leading_space (bool): keep a single leading space if raw begins with whitespace
+    Returns:
+        text (str): the decoded text
+    '''
+    text = raw.decode(FEED_ENCODING, errors='ignore')
+    collapsed = ' '.join(text.split())
+    if keep_leading_space and collapsed and text[:1].isspace():
+        collapsed = ' ' + collapsed
+
+    return collapsed
+
+
+def parse_feed_bytes(buf, start = 0, end = None, fields = None, compact = False):
+    '''
+    Convert the pseudo-xml of a nightly file to a JSON compatible dictionary, working directly
+    on its raw bytes. Tags are found with bytes patterns and only the text of the fields being
+    kept is decoded. This gives the same result as pseudo_xml_to_json() does for the lines of 
+    the same file.
+    Arguments:
+        buf (bytes, mmap): the raw contents of a nightly file
+        start (int): the offset to start parsing at
+        end (None or int): the offset to stop parsing at. Defaults to len(buf)
+        fields (None or set): the sub-tags to keep. If None, keep them all.
+        compact (bool): if True, return each notice as a utils.notice.Notice instead of a dict
+    Returns:
+        merge_notices_dict (dict): a dictionary with keys for each notice type and arrays of notice
+                                   dicts as values.
+    '''
+    tag_count = Counter()
+    for line_start, line_end in iter_line_spans(buf, start, end):
+        match = END_TAG_RE_B.search(buf, line_start, line_end)
+        if match:
+            tag_count[ALPHAS_RE_B.sub(b'', match.group()).decode('ascii')] += 1
+    notices_dict_incrementer = {k:0 for k in NOTICE_TYPES}
+    matches_dict = {k:{k:[] for k in range(v)} for k,v in tag_count.items()}
+    last_clean_notice_start_tag = ''
+    last_sub_tab = ''
+    for line_start, line_end in iter_line_spans(buf, start, end):
+        match = NOTICE_TYPE_START_TAG_RE_B.search(buf, line_start, line_end)
+        if match:
+            last_clean_notice_start_tag = ALPHAS_RE_B.sub(b'', match.group()).decode('ascii')
+            continue
+        if NOTICE_TYPE_END_TAG_RE_B.search(buf, line_start, line_end):
+            notices_dict_incrementer[last_clean_notice_start_tag] += 1
+            continue
+        line = HTML_TAG_RE_B.sub(b' ', buf[line_start:line_end].replace(b"<br />", b' '))
+        matches = SUB_TAG_GROUPS_RE_B.search(line)
+        if matches:
+            sub_tag = matches.group(1).decode('ascii')
+            last_sub_tab = sub_tag
+            current_tag_index = notices_dict_incrementer[last_clean_notice_start_tag]
+            if fields is not None and sub_tag not in fields:
+                continue
+            sub_tag_text = cached_clean_line_text(decode_field(matches.group(2), keep_leading_space = True))
+            matches_dict[last_clean_notice_start_tag][current_tag_index].append({sub_tag:sub_tag_text})
         else:
-            pass
-    merge_notices_dict
+            if fields is not None and last_sub_tab not in fields:
+                continue
+            records = matches_dict[last_clean_notice_start_tag][current_tag_index]
+            append_continuation(records, last_sub_tab, cached_clean_line_text(decode_field(line)))
 
-    return merge_notices_dict
+    return matches_to_notices(matches_dict, compact)
+
+
+def pseudo_xml_to_json_mmap(file_name, fields = None, workers = 1, start = 0, end = None, compact = False):
+    '''
+    Memory-map a downloaded nightly file and parse it with parse_feed_bytes().
+    Arguments:
+        file_name (str): the absolute path to the downloaded file
+        fields (None or set): the sub-tags to keep. If None, keep them all.
+        workers (int): if more than one, split the file (or the part of it from start to end) at
+                       notice boundaries and parse the chunks in a pool of this many processes.
+        start (int): the offset to start parsing at. Must be the start of a line
+        end (None or int): the offset to stop parsing at. Defaults to the end of the file
+        compact (bool): if True, return each notice as a utils.notice.Notice instead of a dict
+    Returns:
+        merge_notices_dict (dict): a dictionary with keys for each notice type and arrays of notice
+                                   dicts as values.
+    '''
+    with open(file_name, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            #you can't mmap an empty file
+            return parse_feed_bytes(b'', fields = fields, compact = compact)
+        with mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ) as buf:
+            if workers > 1:
+                chunks = split_feed_bytes(buf, workers * CHUNKS_PER_WORKER, start, end)
+            else:
+                chunks = [(start, end)]
+            if len(chunks) == 1:
+                return parse_feed_bytes(buf, start, end, fields, compact)
+    #each worker maps the file itself so only the offsets need to be sent to it
+    with ProcessPoolExecutor(max_workers = workers) as executor:
+        futures = [executor.submit(call_with_cache_stats, pseudo_xml_to_json_mmap, file_name, fields, 
+                                   start = chunk_start, end = chunk_end, compact = compact)
+                   for chunk_start, chunk_end in chunks]
+        return merge_notice_chunks(add_worker_cache_stats(future.result() for future in futures))
+
+
+def output_file_name(date, compression = None):
+    '''
+    Return the name of the file write_nightly_data() writes a date's notices to.
+    '''
+    ext = COMPRESSION_EXTENSIONS[compression] if compression else '.json'
+
+    return f"{date}-result{ext}"
+
+
+def pending_output_files(date):
+    '''
+    Return the paths of a date's output files in data/ that write_to_csv() hasn't added to data.csv yet.
+    '''
+    out_path = os.path.join(os.getcwd(), 'data')
+    file_names = [output_file_name(date)] + [output_file_name(date, c) for c in COMPRESSION_EXTENSIONS]
+
+    return [os.path.join(out_path, f) for f in file_names if os.path.exists(os.path.join(out_path, f))]
 
 
-def write_nightly_data(merge_notices_dict, date):
+def write_nightly_data(merge_notices_dict, date, compression = None):
     '''
-    Write a dict of notice data to json
+    Write a dict of notice data to json. If compression is "gzip" or "zstd", write
+    compressed NDJSON (one notice per line) instead of a single JSON document. The file
+    is replaced in one step so that a failed run never leaves a half-written file behind.
+    Returns:
+        file_name (str): the path of the file written
     '''
     out_path = make_outpath('data')
-    json_file = f"{date}-result.json"
-    json_file = os.path.join(out_path, json_file)
-    with open(json_file, 'w') as f:
-        json.dump(merge_notices_dict, f)
+    file_name = os.path.join(out_path, output_file_name(date, compression))
+    tmp_file_name = file_name + '.tmp'
+    if compression:
+        write_ndjson(merge_notices_dict, tmp_file_name, compression)
+    else:
+        with open(tmp_file_name, 'w') as f:
+            json.dump(merge_notices_dict, f, default = to_json_default)
+    os.replace(tmp_file_name, file_name)
+
+    return file_name
+
+
+def add_to_pending(merge_notices_dict, date, compression = None):
+    '''
+    Write a date's new notices, merging them into any of the date's output files that are
+    still waiting for write_to_csv() so that the notices in those files aren't lost.
+    Parameters:
+        merge_notices_dict (dict): a dictionary with keys for each notice type and arrays of notice
+                                   dicts as values.
+        date (str): the date of the notices, "%Y%m%d"
+        compression (None or str): if "gzip" or "zstd", write compressed NDJSON instead of JSON.
+    Returns:
+        added (int): the number of notices that weren't already pending
+    '''
+    pending_files = pending_output_files(date)
+    pending_notices_dict = {}
+    for pending_file in pending_files:
+        for notice_type, notices in read_data_file(pending_file).items():
+            pending_notices_dict.setdefault(notice_type, []).extend(notices)
+    new_notices_dict, hashes = filter_unseen(merge_notices_dict, set(notice_hashes(pending_notices_dict)))
+    if pending_files and not hashes:
+        return 0
+    for notice_type, notices in new_notices_dict.items():
+        pending_notices_dict.setdefault(notice_type, []).extend(notices)
+    file_name = write_nightly_data(pending_notices_dict, date, compression)
+    for pending_file in pending_files:
+        if pending_file != file_name:
+            os.remove(pending_file)
+
+    return len(hashes)
 
 
 def tbm_filter(merge_notices_dict):
@@ -340,13 +790,15 @@ def tbm_filter(merge_notices_dict):
     return tbm_notices
 
 
-def get_nightly_data(date = None, tbm_filtering = True):
+def get_nightly_data(date = None, tbm_filtering = True, compression = None, workers = 1):
     '''
     Exectutes methods in fbo_nightly_scraper module.
     Parameters:
         date (None or str): if a str, must be a date of th "%Y%m%d" format. If none, defaults to 
                             (datetime.now() - timedelta(2)).strftime("%Y%m%d")
-        notice_types (list): notice types to scrape from fbo.
+        tbm_filtering (bool): whether or not to filter for TBM solicitations.
+        compression (None or str): if "gzip" or "zstd", write compressed NDJSON instead of JSON.
+        workers (int): the number of processes to parse the nightly file with.
     Returns:
         nightly_data (list): list of dicts in JSON format.
     '''
@@ -355,16 +807,33 @@ def get_nightly_data(date = None, tbm_filtering = True):
         now_minus_two = datetime.utcnow() - timedelta(2)
         date = now_minus_two.strftime("%Y%m%d")
     fbo_ftp_url = f'ftp://ftp.fbo.gov/FBOFeed{date}'
-    file_lines = download_from_ftp(date, fbo_ftp_url)
-    if not file_lines:
-        #exit program if download_from_ftp() failed (this is logged by the module)
+    file_name = download_feed_file(date, fbo_ftp_url)
+    if not file_name:
+        #exit program if download_feed_file() failed (this is logged by the module)
+        sys.exit(1)
+    if not os.path.getsize(file_name):
+        logger.critical(f"{fbo_ftp_url} is empty")
+        os.remove(file_name)
         sys.exit(1)
-    merge_notices_dict = pseudo_xml_to_json(file_lines)
+    cache_stats = CLEAN_LINE_CACHE.stats()
+    try:
+        merge_notices_dict = pseudo_xml_to_json_mmap(file_name, workers = workers)
+    finally:
+        os.remove(file_name)
+    cache_stats = stats_delta(cache_stats, CLEAN_LINE_CACHE.stats())
+    logger.info(f"Cleaning {date}: {cache_stats['hits']} cache hits, {cache_stats['misses']} misses "
+                f"({cache_stats['hit_rate']:.0%} hit rate), {cache_stats['evictions']} evictions")
     if tbm_filtering:
-        tbm_notices = tbm_filter(merge_notices_dict)
-        write_nightly_data(tbm_notices, date)
-    else:
-        write_nightly_data(merge_notices_dict, date)
+        merge_notices_dict = tbm_filter(merge_notices_dict)
+    #only write the notices that an earlier scan of this date didn't already store unchanged.
+    #The index is updated by write_to_csv() once the notices are in data.csv.
+    seen = load_index(date)
+    new_notices_dict, hashes = filter_unseen(merge_notices_dict, seen or set())
+    if seen is not None and not hashes:
+        logger.info(f"Every notice from {date} has already been stored")
+        return
+    added = add_to_pending(new_notices_dict, date, compression)
+    logger.info(f"{added} new notices from {date} are waiting to be added to data.csv")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,94 @@
+from collections import OrderedDict
+import sys
+
+
+class LRUCache:
+    '''
+    A least-recently-used cache bounded by its number of entries and/or the bytes its keys and
+    values take up, which keeps count of its hits and misses. functools.lru_cache can only be
+    bounded by the number of entries and can't merge the counts from other processes.
+    '''
+
+    def __init__(self, max_entries = None, max_bytes = None):
+        '''
+        Parameters:
+            max_entries (None or int): the most entries to keep. None means no limit
+            max_bytes (None or int): the most bytes (per sys.getsizeof) of keys and values to keep.
+                                     None means no limit
+        '''
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get_or_compute(self, key, fn):
+        '''
+        Return the cached value for key, computing it with fn(key) and caching it on a miss.
+        '''
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            value = fn(key)
+            self.put(key, value)
+            return value
+        self._data.move_to_end(key)
+        self.hits += 1
+
+        return value
+
+    def put(self, key, value):
+        size = sys.getsizeof(key) + sys.getsizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        if key in self._data:
+            old_value = self._data.pop(key)
+            self.bytes -= sys.getsizeof(key) + sys.getsizeof(old_value)
+        self._data[key] = value
+        self.bytes += size
+        while ((self.max_entries is not None and len(self._data) > self.max_entries) or
+               (self.max_bytes is not None and self.bytes > self.max_bytes)):
+            old_key, old_value = self._data.popitem(last = False)
+            self.bytes -= sys.getsizeof(old_key) + sys.getsizeof(old_value)
+            self.evictions += 1
+
+    def clear(self):
+        self._data.clear()
+        self.bytes = 0
+
+    def stats(self):
+        '''
+        Returns:
+            stats (dict): the hits, misses and evictions so far as well as the current entries and bytes
+        '''
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._data),
+                'bytes': self.bytes}
+
+    def add_stats(self, stats):
+        '''
+        Add the hits, misses and evictions counted elsewhere (e.g. by the same cache in a worker
+        process) to this cache's counts.
+        '''
+        self.hits += stats['hits']
+        self.misses += stats['misses']
+        self.evictions += stats['evictions']
+
+
+def stats_delta(before, after):
+    '''
+    The hits, misses and evictions counted between two LRUCache.stats() snapshots, with the hit rate.
+    '''
+    delta = {k: after[k] - before[k] for k in ('hits', 'misses', 'evictions')}
+    lookups = delta['hits'] + delta['misses']
+    delta['hit_rate'] = delta['hits'] / lookups if lookups else 0.0
+
+    return delta
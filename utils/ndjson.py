@@ -0,0 +1,102 @@
+import gzip
+import io
+import json
+
+from utils.notice import to_json_default
+
+#optional dependencies: orjson is a faster json encoder/decoder and zstandard
+#gives better compression than gzip. We fall back to the standard library without them.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSION_EXTENSIONS = {'gzip': '.ndjson.gz',
+                          'zstd': '.ndjson.zst'}
+
+
+def dumps(obj):
+    '''
+    Serialize obj to a single line of JSON as bytes, using orjson if it's installed.
+    '''
+    if orjson:
+        return orjson.dumps(obj, default = to_json_default)
+    return json.dumps(obj, separators=(',', ':'), default = to_json_default).encode('utf8')
+
+
+def loads(line):
+    '''
+    Deserialize a line of JSON (bytes or str), using orjson if it's installed.
+    '''
+    if orjson:
+        return orjson.loads(line)
+    return json.loads(line)
+
+
+def compression_from_path(file_path):
+    '''
+    Given the path to an NDJSON file, return its compression ("gzip" or "zstd") or None
+    if the path isn't a compressed NDJSON file.
+    '''
+    for compression, ext in COMPRESSION_EXTENSIONS.items():
+        if file_path.endswith(ext):
+            return compression
+
+
+def open_ndjson(file_path, mode = 'rb', compression = None):
+    '''
+    Open a compressed NDJSON file as a binary file object.
+    Parameters:
+        file_path (str): the path to the file
+        mode (str): either 'rb' or 'wb'
+        compression (None or str): "gzip" or "zstd". If None, inferred from the file extension.
+    Returns:
+        f: a binary file-like object
+    '''
+    compression = compression or compression_from_path(file_path)
+    if compression == 'gzip':
+        return gzip.open(file_path, mode)
+    if compression == 'zstd':
+        if not zstandard:
+            raise ImportError("zstd compression requires the zstandard package")
+        if 'w' in mode:
+            return zstandard.open(file_path, mode, cctx = zstandard.ZstdCompressor(level = 10))
+        return zstandard.open(file_path, mode)
+    raise ValueError(f"Unknown compression for {file_path}: {compression}")
+
+
+def write_ndjson(merge_notices_dict, file_path, compression = 'gzip'):
+    '''
+    Write a dict of notice data as compressed NDJSON, one notice per line. Each line is an
+    object with the notice type and the notice itself so the dict can be rebuilt on read.
+    Parameters:
+        merge_notices_dict (dict): a dictionary with keys for each notice type and arrays of notice
+                                   dicts as values.
+        file_path (str): the path of the file to write
+        compression (str): "gzip" or "zstd"
+    '''
+    with open_ndjson(file_path, 'wb', compression) as f:
+        for notice_type, notices in merge_notices_dict.items():
+            for notice in notices:
+                f.write(dumps({'notice type': notice_type, 'notice': notice}))
+                f.write(b'\n')
+
+
+def iter_ndjson(file_path):
+    '''
+    Lazily read a compressed NDJSON file written by write_ndjson().
+    Parameters:
+        file_path (str): the path to the file
+    Yields:
+        (notice_type, notice) tuples in the order they were written
+    '''
+    with open_ndjson(file_path, 'rb') as f:
+        for line in io.BufferedReader(f):
+            if not line.strip():
+                continue
+            record = loads(line)
+            yield record['notice type'], record['notice']
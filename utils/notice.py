@@ -0,0 +1,119 @@
+from collections.abc import Mapping, MutableMapping
+import sys
+
+#sub-tags whose values repeat across many notices, so it's worth sharing one copy of each value
+LOW_CARDINALITY_FIELDS = {'DATE', 'YEAR', 'AGENCY', 'OFFICE', 'LOCATION', 'ZIP', 'CLASSCOD', 'NAICS',
+                          'OFFADD', 'SETASIDE', 'POPCOUNTRY', 'POPZIP', 'POPADDRESS', 'RESPDATE',
+                          'ARCHDATE', 'AWDDATE'}
+
+
+class KeyTable:
+    '''
+    An ordered set of sub-tags shared by every Notice with the same keys in the same order.
+    '''
+    __slots__ = ('keys', 'index')
+
+    def __init__(self, keys):
+        self.keys = keys
+        self.index = {key: i for i, key in enumerate(keys)}
+
+
+_key_tables = {}
+
+
+def get_key_table(keys):
+    '''
+    Return the shared KeyTable for a tuple of keys, creating it if need be.
+    '''
+    try:
+        return _key_tables[keys]
+    except KeyError:
+        keys = tuple(sys.intern(key) for key in keys)
+        table = _key_tables[keys] = KeyTable(keys)
+        return table
+
+
+def intern_value(key, value):
+    '''
+    Intern the value of a low-cardinality field so that notices share one copy of it.
+    '''
+    if key in LOW_CARDINALITY_FIELDS and isinstance(value, str):
+        return sys.intern(value)
+
+    return value
+
+
+class Notice(MutableMapping):
+    '''
+    A compact, dict-like notice. The keys live in a KeyTable shared with every other notice that
+    has the same sub-tags, so each notice only stores a tuple of its values. Use to_json_default()
+    to serialize it with json.
+    '''
+    __slots__ = ('_table', '_values')
+
+    def __init__(self, items = ()):
+        if isinstance(items, Mapping):
+            items = items.items()
+        keys, values = [], []
+        for key, value in items:
+            keys.append(key)
+            values.append(intern_value(key, value))
+        self._table = get_key_table(tuple(keys))
+        self._values = tuple(values)
+
+    def __getitem__(self, key):
+        return self._values[self._table.index[key]]
+
+    def __iter__(self):
+        return iter(self._table.keys)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __contains__(self, key):
+        return key in self._table.index
+
+    def __setitem__(self, key, value):
+        value = intern_value(key, value)
+        i = self._table.index.get(key)
+        if i is None:
+            self._table = get_key_table(self._table.keys + (key,))
+            self._values = self._values + (value,)
+        else:
+            self._values = self._values[:i] + (value,) + self._values[i + 1:]
+
+    def __delitem__(self, key):
+        i = self._table.index[key]
+        keys = self._table.keys
+        self._table = get_key_table(keys[:i] + keys[i + 1:])
+        self._values = self._values[:i] + self._values[i + 1:]
+
+    def __reduce__(self):
+        #rebuild from items so that unpickled notices (e.g. from a process pool) share key tables too
+        return (Notice, (list(self.items()),))
+
+    def __repr__(self):
+        return f'Notice({dict(self.items())!r})'
+
+    def to_dict(self):
+        return dict(zip(self._table.keys, self._values))
+
+
+def to_json_default(obj):
+    '''
+    The default argument for json.dump() and orjson.dumps() so they can serialize Notices.
+    '''
+    if isinstance(obj, Notice):
+        return obj.to_dict()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def notice_object_hook(pairs):
+    '''
+    The object_pairs_hook for json.load() that turns each notice into a Notice. The other objects
+    (e.g. the dict of notice types) are left as dicts.
+    '''
+    if all(isinstance(value, str) for _, value in pairs):
+        return Notice(pairs)
+
+    return dict(pairs)
@@ -0,0 +1,86 @@
+import hashlib
+import json
+import os
+
+from utils.notice import to_json_default
+
+
+def notice_hash(notice_type, notice):
+    '''
+    Return a hash of a notice's content that's stable across runs and key order.
+    Parameters:
+        notice_type (str): the notice's type, e.g. "PRESOL"
+        notice (dict or Notice): the notice
+    Returns:
+        (str): the hex digest
+    '''
+    payload = json.dumps([notice_type, notice], sort_keys = True, separators = (',', ':'),
+                         ensure_ascii = False, default = to_json_default)
+
+    return hashlib.sha1(payload.encode('utf8')).hexdigest()
+
+
+def notice_hashes(merge_notices_dict):
+    '''
+    Return the hashes of every notice in a dict with keys for each notice type and arrays of
+    notice dicts as values.
+    '''
+    return [notice_hash(notice_type, notice) for notice_type, notices in merge_notices_dict.items()
+            for notice in notices]
+
+
+def index_path(date, index_dir = None):
+    '''
+    Return the path of a date's index file. There's one file per date so that the processes
+    scanning different dates never write to the same file.
+    '''
+    index_dir = index_dir or os.path.join(os.getcwd(), 'notice_index')
+
+    return os.path.join(index_dir, f'{date}.txt')
+
+
+def load_index(date, index_dir = None):
+    '''
+    Return the set of hashes of the notices from a date that are already in data.csv or None
+    if the date hasn't been stored before.
+    '''
+    file_name = index_path(date, index_dir)
+    if not os.path.exists(file_name):
+        return
+    with open(file_name, 'r') as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+def update_index(date, hashes, index_dir = None):
+    '''
+    Record the hashes of notices that have been added to data.csv in a date's index, creating
+    it if need be. This should only happen once they're in data.csv, since notices in the index
+    are never written again.
+    '''
+    file_name = index_path(date, index_dir)
+    os.makedirs(os.path.dirname(file_name), exist_ok = True)
+    with open(file_name, 'a') as f:
+        f.writelines(f'{h}\n' for h in hashes)
+
+
+def filter_unseen(merge_notices_dict, seen):
+    '''
+    Drop the notices whose hash is in seen, i.e. that were already stored unchanged.
+    Parameters:
+        merge_notices_dict (dict): a dictionary with keys for each notice type and arrays of notice
+                                   dicts as values.
+        seen (set): the hashes of the notices already stored
+    Returns:
+        unseen_notices_dict (dict): merge_notices_dict without the notices already stored
+        hashes (list): the hashes of the notices in unseen_notices_dict
+    '''
+    unseen_notices_dict = {k:[] for k in merge_notices_dict}
+    hashes = []
+    for notice_type, notices in merge_notices_dict.items():
+        for notice in notices:
+            h = notice_hash(notice_type, notice)
+            if h not in seen:
+                unseen_notices_dict[notice_type].append(notice)
+                hashes.append(h)
+
+    return unseen_notices_dict, hashes
@@ -0,0 +1,238 @@
+import csv
+from datetime import datetime, timedelta
+import json
+import os
+
+from utils.csv_limits import large_csv_fields
+
+#the columns of data.csv that notices are counted by, besides the fbo date
+ROLLUP_DIMENSIONS = ('notice type', 'AGENCY', 'NAICS', 'SETASIDE')
+PERIODS = ('day', 'week', 'month')
+#the periods that counts are kept for, besides each day
+STORED_PERIODS = ('week', 'month')
+
+
+def rollups_path(rollups_dir = None):
+    '''
+    Return the path of the rollups file, which is kept next to data.csv.
+    '''
+    rollups_dir = rollups_dir or os.getcwd()
+
+    return os.path.join(rollups_dir, 'rollups.json')
+
+
+def empty_rollups():
+    '''
+    Return rollups with nothing counted yet. "dates" holds the number of notices per fbo date,
+    "by_date" holds the per-date counts of each dimension's values and "totals" holds each
+    dimension's counts across every date so that all-time summaries never have to add up dates.
+    "periods" holds the same counts as "dates" and "by_date" per week and per month, and
+    "first_date" and "last_date" bound the dates counted so far.
+    '''
+    return {'dates': {},
+            'by_date': {dimension: {} for dimension in ROLLUP_DIMENSIONS},
+            'totals': {dimension: {} for dimension in ROLLUP_DIMENSIONS},
+            'periods': {period: {'dates': {}, 'by_date': {dimension: {} for dimension in ROLLUP_DIMENSIONS}}
+                        for period in STORED_PERIODS},
+            'first_date': None,
+            'last_date': None}
+
+
+def add_periods(rollups):
+    '''
+    Add the per-period counts and the first and last dates to rollups saved before they were kept.
+    '''
+    per_date = rollups['dates']
+    rollups['first_date'] = min(per_date, default = None)
+    rollups['last_date'] = max(per_date, default = None)
+    rollups['periods'] = {}
+    for period in STORED_PERIODS:
+        counts = {'dates': {}, 'by_date': {dimension: {} for dimension in ROLLUP_DIMENSIONS}}
+        for fbo_date, n in per_date.items():
+            key = period_key(fbo_date, period)
+            counts['dates'][key] = counts['dates'].get(key, 0) + n
+        for dimension in ROLLUP_DIMENSIONS:
+            for fbo_date, date_counts in rollups['by_date'][dimension].items():
+                add_counts(counts['by_date'][dimension].setdefault(period_key(fbo_date, period), {}),
+                           date_counts)
+        rollups['periods'][period] = counts
+
+    return rollups
+
+
+def load_rollups(file_name = None):
+    '''
+    Return the rollups stored in file_name (rollups.json by default) or None if there aren't any.
+    '''
+    file_name = file_name or rollups_path()
+    if not os.path.exists(file_name):
+        return
+    with open(file_name, 'r') as f:
+        rollups = json.load(f)
+    if 'periods' not in rollups:
+        add_periods(rollups)
+
+    return rollups
+
+
+def save_rollups(rollups, file_name = None):
+    '''
+    Write the rollups to file_name (rollups.json by default). The file is replaced in one step so
+    that a failed run never leaves half-written rollups behind.
+    '''
+    file_name = file_name or rollups_path()
+    tmp_file_name = file_name + '.tmp'
+    with open(tmp_file_name, 'w') as f:
+        json.dump(rollups, f, sort_keys = True)
+    os.replace(tmp_file_name, file_name)
+
+
+def is_missing(value):
+    '''
+    Whether a data.csv value is missing, i.e. absent, empty or a NaN read in by pandas.
+    '''
+    return value is None or value == '' or value != value
+
+
+def add_counts(target, counts):
+    '''
+    Add the counts in one dict of value counts to another, in place.
+    '''
+    for value, count in counts.items():
+        target[value] = target.get(value, 0) + count
+
+
+def update_rollups(rollups, csv_rows):
+    '''
+    Add rows on their way into data.csv to the rollups.
+    Parameters:
+        rollups (dict): rollups from empty_rollups() or load_rollups(), updated in place
+        csv_rows (iterable): dicts with the "fbo date", "notice type" and notice fields, as returned
+                             by transform_data()
+    Returns:
+        rollups (dict): the updated rollups
+    '''
+    for csv_row in csv_rows:
+        fbo_date = str(csv_row['fbo date'])
+        period_keys = {period: period_key(fbo_date, period) for period in STORED_PERIODS}
+        if fbo_date not in rollups['dates']:
+            rollups['dates'][fbo_date] = 0
+            for period, key in period_keys.items():
+                rollups['periods'][period]['dates'].setdefault(key, 0)
+            if rollups['first_date'] is None or fbo_date < rollups['first_date']:
+                rollups['first_date'] = fbo_date
+            if rollups['last_date'] is None or fbo_date > rollups['last_date']:
+                rollups['last_date'] = fbo_date
+        if csv_row.get('notice type') == 'NA':
+            #the placeholder row for a date without notices
+            continue
+        rollups['dates'][fbo_date] += 1
+        for period, key in period_keys.items():
+            rollups['periods'][period]['dates'][key] += 1
+        for dimension in ROLLUP_DIMENSIONS:
+            value = csv_row.get(dimension)
+            if is_missing(value):
+                continue
+            count = {str(value): 1}
+            add_counts(rollups['by_date'][dimension].setdefault(fbo_date, {}), count)
+            add_counts(rollups['totals'][dimension], count)
+            for period, key in period_keys.items():
+                add_counts(rollups['periods'][period]['by_date'][dimension].setdefault(key, {}), count)
+
+    return rollups
+
+
+def rebuild_rollups(csv_file):
+    '''
+    Build the rollups from scratch by streaming the rows of an existing data.csv.
+    '''
+    rollups = empty_rollups()
+    with large_csv_fields(), open(csv_file, 'r', newline = '') as f:
+        update_rollups(rollups, csv.DictReader(f))
+
+    return rollups
+
+
+def period_key(fbo_date, period):
+    '''
+    Return the period an fbo date (YYYYMMDD) falls in: the date itself for "day", the date of the
+    week's Monday for "week" and YYYYMM for "month".
+    '''
+    if period == 'day':
+        return fbo_date
+    if period == 'month':
+        return fbo_date[:6]
+    if period == 'week':
+        date = datetime.strptime(fbo_date, "%Y%m%d")
+        return (date - timedelta(days = date.weekday())).strftime("%Y%m%d")
+    raise ValueError(f"period must be one of {PERIODS}, not {period}")
+
+
+def dates_in_range(per_date, start, end):
+    '''
+    Yield the fbo dates in per_date from start to end, inclusive. The days in the range are looked
+    up one by one, so the cost depends on the length of the range rather than the history.
+    '''
+    date = datetime.strptime(start, "%Y%m%d")
+    end_date = datetime.strptime(end, "%Y%m%d")
+    while date <= end_date:
+        fbo_date = date.strftime("%Y%m%d")
+        if fbo_date in per_date:
+            yield fbo_date
+        date += timedelta(days = 1)
+
+
+def query_rollup(rollups, dimension, start = None, end = None, period = None):
+    '''
+    Count notices by one of the rollup dimensions. Without start or end, the counts are read
+    straight from the stored totals (or per-period counts). With either, each day from start (or
+    the first date) to end (or the last date) is looked up, so the cost grows with the length of
+    the range, not with the history.
+    Parameters:
+        rollups (dict): rollups from load_rollups()
+        dimension (str): "fbo date" or one of ROLLUP_DIMENSIONS
+        start, end (None or str): the first and last fbo dates (YYYYMMDD) to count. None means
+                                  unbounded
+        period (None or str): "day", "week" or "month" to break the counts down by period
+    Returns:
+        counts (dict): values of the dimension as keys and counts as values. For "fbo date", the
+                       number of notices per date. With a period, a dict of such dicts with the
+                       periods as keys
+    '''
+    if dimension != 'fbo date' and dimension not in ROLLUP_DIMENSIONS:
+        raise ValueError(f"dimension must be 'fbo date' or one of {ROLLUP_DIMENSIONS}, not {dimension}")
+    if period is not None and period not in PERIODS:
+        raise ValueError(f"period must be one of {PERIODS}, not {period}")
+    if dimension == 'fbo date':
+        period = period or 'day'
+    if start is None and end is None:
+        if period is None:
+            return dict(rollups['totals'][dimension])
+        stored = rollups if period == 'day' else rollups['periods'][period]
+        if dimension == 'fbo date':
+            return dict(stored['dates'])
+        return {key: dict(counts) for key, counts in stored['by_date'][dimension].items()}
+    start = start or rollups['first_date']
+    end = end or rollups['last_date']
+    if start is None or end is None:
+        return {}
+    per_date = rollups['dates'] if dimension == 'fbo date' else rollups['by_date'][dimension]
+    counts = {}
+    for fbo_date in dates_in_range(per_date, start, end):
+        if dimension == 'fbo date':
+            key = period_key(fbo_date, period)
+            counts[key] = counts.get(key, 0) + per_date[fbo_date]
+            continue
+        target = counts.setdefault(period_key(fbo_date, period), {}) if period else counts
+        add_counts(target, per_date[fbo_date])
+
+    return counts
+
+
+def top_values(rollups, dimension, n = 10, start = None, end = None):
+    '''
+    Return the n most common values of a dimension as (value, count) tuples, most common first.
+    '''
+    counts = query_rollup(rollups, dimension, start, end)
+
+    return sorted(counts.items(), key = lambda item: (-item[1], item[0]))[:n]
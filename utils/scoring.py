@@ -0,0 +1,114 @@
+import re
+
+import numpy as np
+
+#the terms of the tbm_filter() regex, weighted by how specific they are to TBM
+DEFAULT_WEIGHTS = {'tbm': 2.0,
+                   'tbma': 2.0,
+                   'technology business management': 4.0,
+                   'tbm framework': 4.0,
+                   'it spending transparency': 3.0,
+                   'it tower': 1.0,
+                   'sub-towers': 1.0}
+#the phrase that tbm_filter() uses to exclude "tbm" meaning a missile
+DEFAULT_EXCLUDE = ('tactical ballistic missile',)
+#a match in the subject says more about a notice than one in its description
+DEFAULT_FIELD_WEIGHTS = {'SUBJECT': 2.0, 'DESC': 1.0}
+DEFAULT_THRESHOLD = 1.0
+
+
+def compile_terms(terms):
+    '''
+    Compile a single regex that matches any of the terms as whole words. Longer terms come first
+    so that, e.g., "tbm framework" isn't matched as "tbm".
+    Parameters:
+        terms (list): lowercase terms and phrases
+    Returns:
+        terms_re (re.Pattern): each term is its own group, in order of length
+        term_index (numpy.ndarray): maps match.lastindex - 1 to the index of the term in terms
+    '''
+    order = sorted(range(len(terms)), key = lambda i: len(terms[i]), reverse = True)
+    terms_re = re.compile('|'.join(rf'\b({re.escape(terms[i])})\b' for i in order))
+
+    return terms_re, np.array(order, dtype = int)
+
+
+def term_matrix(texts, terms_re, term_index):
+    '''
+    Count the occurrences of each term in each text with one pass of the regex over all of them.
+    Parameters:
+        texts (list): lowercase strs
+        terms_re (re.Pattern), term_index (numpy.ndarray): from compile_terms()
+    Returns:
+        counts (numpy.ndarray): a len(texts) x len(terms) array of counts
+    '''
+    counts = np.zeros((len(texts), len(term_index)))
+    if not texts:
+        return counts
+    #the terms never span a newline, so joining on one keeps matches within a single text
+    joined = '\n'.join(texts)
+    starts = np.cumsum([0] + [len(text) + 1 for text in texts[:-1]])
+    matches = [(m.start(), m.lastindex - 1) for m in terms_re.finditer(joined)]
+    if matches:
+        positions, groups = np.array(matches).T
+        rows = np.searchsorted(starts, positions, side = 'right') - 1
+        np.add.at(counts, (rows, term_index[groups]), 1)
+
+    return counts
+
+
+def score_notices(merge_notices_dict, weights = None, field_weights = None, exclude = None):
+    '''
+    Score a day's notices for relevance to TBM. A notice's score is the sum, over its fields and the
+    terms, of field weight x term weight x log(1 + the number of times the term appears in the field).
+    Parameters:
+        merge_notices_dict (dict): a dictionary with keys for each notice type and arrays of notice
+                                   dicts as values.
+        weights (None or dict): terms as keys and weights as values. Negative weights penalize
+                                notices. Defaults to DEFAULT_WEIGHTS
+        field_weights (None or dict): the fields to score as keys and weights as values. Defaults
+                                      to DEFAULT_FIELD_WEIGHTS
+        exclude (None or iterable): terms that rule a notice out, however well it otherwise scores,
+                                    if they appear in any of the scored fields. Such notices score
+                                    -inf. Defaults to DEFAULT_EXCLUDE
+    Returns:
+        scores (numpy.ndarray): the score of each notice
+        notices (list): (notice_type, notice) tuples in the same order as scores
+    '''
+    weights = DEFAULT_WEIGHTS if weights is None else weights
+    field_weights = DEFAULT_FIELD_WEIGHTS if field_weights is None else field_weights
+    exclude = [term.lower() for term in (DEFAULT_EXCLUDE if exclude is None else exclude)]
+    terms = [term.lower() for term in weights]
+    term_weights = np.array(list(weights.values()), dtype = float)
+    terms_re, term_index = compile_terms(terms)
+    if exclude:
+        exclude_re, exclude_index = compile_terms(exclude)
+    notices = [(notice_type, notice) for notice_type, notices in merge_notices_dict.items()
+               for notice in notices]
+    scores = np.zeros(len(notices))
+    excluded = np.zeros(len(notices), dtype = bool)
+    for field, field_weight in field_weights.items():
+        texts = [notice.get(field, '').lower() for _, notice in notices]
+        counts = term_matrix(texts, terms_re, term_index)
+        scores += field_weight * (np.log1p(counts) @ term_weights)
+        if exclude:
+            excluded |= term_matrix(texts, exclude_re, exclude_index).any(axis = 1)
+    scores[excluded] = -np.inf
+
+    return scores, notices
+
+
+def rank_notices(merge_notices_dict, threshold = DEFAULT_THRESHOLD, weights = None, field_weights = None,
+                 exclude = None):
+    '''
+    Score a day's notices with score_notices() and rank the ones that meet the threshold. Notices
+    with an excluded term are never ranked.
+    Returns:
+        ranked (list): (score, notice_type, notice) tuples, highest score first
+    '''
+    scores, notices = score_notices(merge_notices_dict, weights, field_weights, exclude)
+    order = np.argsort(-scores, kind = 'stable')
+    ranked = [(float(scores[i]), *notices[i]) for i in order
+              if scores[i] >= threshold and scores[i] != -np.inf]
+
+    return ranked
@@ -6,9 +6,43 @@ import sys
 
 import pandas as pd
 
+from utils.ndjson import compression_from_path, iter_ndjson
+from utils.notice import Notice, notice_object_hook
+from utils.notice_index import notice_hashes, update_index
+from utils.rollups import empty_rollups, load_rollups, rebuild_rollups, save_rollups, update_rollups
+
+#the fields kept when the output is filtered with --field-filter
+USER_DESIRED_FIELDS = {'AGENCY','CONTACT','DATE','DESC','LOCATION',
+                       'NAICS','RESPDATE','SETASIDE',
+                       'SOLNBR','SUBJECT','URL','YEAR'}
+
+def read_ndjson(ndjson_file):
+    '''
+    Stream a compressed NDJSON file written by write_nightly_data() back into a dict with
+    keys for each notice type and arrays of compact Notices as values.
+    '''
+    data = {}
+    for notice_type, notice in iter_ndjson(ndjson_file):
+        data.setdefault(notice_type, []).append(Notice(notice))
+
+    return data
+
+
+def read_data_file(json_file):
+    '''
+    Read a date's notices written by write_nightly_data(), either JSON or compressed NDJSON.
+    '''
+    if compression_from_path(json_file):
+        return read_ndjson(json_file)
+    with open(json_file, 'r') as jf:
+        #load the notices as compact Notices since every date is held in memory at once
+        return json.load(jf, object_pairs_hook = notice_object_hook)
+
+
 def read_json():
     path_to_json = os.path.join(os.getcwd(),'data')
-    json_files = [f for f in os.listdir(path_to_json) if f.endswith('.json')]
+    json_files = [f for f in os.listdir(path_to_json) 
+                  if f.endswith('.json') or compression_from_path(f)]
     if not json_files:
         print("\tThere's no new FBO data. Wait another day to run this scan.")
         print("\tThis means you can safefully ignore the following error message.")
@@ -19,19 +53,20 @@ def read_json():
     for json_file in json_files:
         json_file = os.path.join(path_to_json, json_file)
         files_to_delete.append(json_file)
-        with open(json_file, 'r') as jf:
-            data = json.load(jf)
-            fbo_date = "".join(s for s in json_file if s.isdigit())
-            all_data.append((fbo_date, data))
+        fbo_date = "".join(s for s in os.path.basename(json_file) if s.isdigit())
+        all_data.append((fbo_date, read_data_file(json_file)))
     
     return all_data, files_to_delete
 
 
-def data_to_df(json_data, field_filter = False):
+def data_to_df(json_data, field_filter = False, rollups = None):
     '''
-    Append data to data.csv after transforming it.
+    Append data to data.csv after transforming it. If rollups are given, the rows are also
+    counted in them (see utils.rollups.update_rollups()).
     '''
     csv_rows = transform_data(json_data, field_filter)
+    if rollups is not None:
+        update_rollups(rollups, csv_rows)
     df = pd.DataFrame(csv_rows)
     
     return df
@@ -42,9 +77,6 @@ def transform_data(json_data, field_filter = False):
     Transform the fbo data returned by get_nightly_data so that each notice dictionary contains
     a key stating its notice type. This will make it easier when writing the results to csv.
     '''
-    user_desired_fields = {'AGENCY','CONTACT','DATE','DESC','LOCATION',
-                           'NAICS','RESPDATE','SETASIDE',
-                           'SOLNBR','SUBJECT','URL','YEAR'}
     csv_rows = []
     fbo_date, data = json_data
     all_empty = True
@@ -56,7 +88,7 @@ def transform_data(json_data, field_filter = False):
             csv_row['fbo date'] = fbo_date
             for key in notice:
                 if field_filter:
-                    if key in user_desired_fields:
+                    if key in USER_DESIRED_FIELDS:
                         csv_row[key] = notice[key]
                 else:
                     csv_row[key] = notice[key]
@@ -78,10 +110,14 @@ def get_last_scan_date(csv_file):
 
 def write_to_csv(field_filter = False):
     all_data, files_to_delete = read_json()
-    dfs = [data_to_df(x, field_filter) for x in all_data]
-    df = pd.concat(dfs, ignore_index=True, sort=True)
     csv_file = os.path.join(os.getcwd(), 'data.csv')
     csv_exists = os.path.exists(csv_file)
+    rollups = load_rollups()
+    if rollups is None:
+        #start the rollups from whatever's already in data.csv
+        rollups = rebuild_rollups(csv_file) if csv_exists else empty_rollups()
+    dfs = [data_to_df(x, field_filter, rollups) for x in all_data]
+    df = pd.concat(dfs, ignore_index=True, sort=True)
     if csv_exists:
         #if there's a pre-existing csv, read it in to concat with this one
         pre_existing_df = pd.read_csv(csv_file, dtype = str)
@@ -90,5 +126,9 @@ def write_to_csv(field_filter = False):
     else:
         #if there's no pre-existing csv, write what we've got as the first one
         df.to_csv(csv_file, index = False)
+    save_rollups(rollups)
+    #now that the notices are in data.csv, record them so that rescans of these dates skip them
+    for fbo_date, data in all_data:
+        update_index(fbo_date, notice_hashes(data))
     #clean up the json files
     [os.remove(f) for f in files_to_delete]
@@ -0,0 +1,116 @@
+import csv
+import os
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+from utils.csv_limits import large_csv_fields
+from utils.writer import USER_DESIRED_FIELDS
+
+#Excel's limits, see https://support.microsoft.com/en-us/office/excel-specifications-and-limits-1672b34d-7043-467e-8e27-269d656771c3
+EXCEL_MAX_ROWS = 1048576
+EXCEL_MAX_CELL_CHARS = 32767
+EXCEL_MAX_SHEET_NAME_CHARS = 31
+SHEET_BY = ('type', 'month')
+#the characters Excel doesn't allow in sheet names
+INVALID_SHEET_NAME_CHARS = str.maketrans('', '', '[]:*?/\\')
+
+
+def sheet_key(csv_row, sheet_by):
+    '''
+    Return the name of the sheet a row of data.csv goes in: its notice type or its fbo month (YYYY-MM).
+    '''
+    if sheet_by == 'type':
+        return csv_row.get('notice type') or 'NA'
+    if sheet_by == 'month':
+        fbo_date = csv_row['fbo date']
+        return f'{fbo_date[:4]}-{fbo_date[4:6]}'
+    raise ValueError(f"sheet_by must be one of {SHEET_BY}, not {sheet_by}")
+
+
+def sheet_title(key, part):
+    '''
+    Return a valid sheet title for the part-th sheet (starting at 1) of a key, e.g. "PRESOL (2)".
+    '''
+    title = key.translate(INVALID_SHEET_NAME_CHARS) or 'NA'
+    suffix = f' ({part})' if part > 1 else ''
+
+    return title[:EXCEL_MAX_SHEET_NAME_CHARS - len(suffix)] + suffix
+
+
+def clean_cell(value, ws):
+    '''
+    Make a value from data.csv safe to write to a cell: empty values are left blank, characters
+    that aren't allowed in XML are removed and text is truncated to Excel's limit. Text that
+    starts with "=" is kept as text rather than written as a formula.
+    '''
+    if not value:
+        return None
+    value = ILLEGAL_CHARACTERS_RE.sub('', value)[:EXCEL_MAX_CELL_CHARS]
+    if value.startswith('='):
+        cell = WriteOnlyCell(ws, value)
+        cell.data_type = 's'
+        return cell
+
+    return value
+
+
+def xlsx_columns(fieldnames, field_filter = False):
+    '''
+    Return the columns to write: "notice type" and "fbo date" first, then the other columns of
+    data.csv, limited to USER_DESIRED_FIELDS if field_filter is True.
+    '''
+    first = ['notice type', 'fbo date']
+    rest = [f for f in fieldnames if f not in first]
+    if field_filter:
+        rest = [f for f in rest if f in USER_DESIRED_FIELDS]
+
+    return first + rest
+
+
+def write_to_xlsx(field_filter = False, sheet_by = 'type', csv_file = None, xlsx_file = None,
+                  max_rows = EXCEL_MAX_ROWS):
+    '''
+    Stream data.csv into an Excel workbook. Rows are read one at a time and the workbook is
+    written in openpyxl's write-only mode, so memory use doesn't grow with the number of rows.
+    Parameters:
+        field_filter (bool): whether to limit the columns to USER_DESIRED_FIELDS
+        sheet_by (str): "type" for a sheet per notice type or "month" for a sheet per fbo month
+        csv_file (None or str): the csv to read. Defaults to data.csv in the current directory
+        xlsx_file (None or str): the workbook to write. Defaults to data.xlsx in the current directory
+        max_rows (int): the most rows, including the header, in a sheet. Once a sheet is full, the
+                        rows continue in a new sheet, e.g. "PRESOL (2)"
+    Returns:
+        sheet_rows (dict): sheet titles as keys and the number of rows (not counting the header) as values
+    '''
+    csv_file = csv_file or os.path.join(os.getcwd(), 'data.csv')
+    xlsx_file = xlsx_file or os.path.join(os.getcwd(), 'data.xlsx')
+    wb = Workbook(write_only = True)
+    #key -> (worksheet, part, rows written including the header)
+    sheets = {}
+    sheet_rows = {}
+    with large_csv_fields(), open(csv_file, 'r', newline = '') as f:
+        reader = csv.DictReader(f)
+        columns = xlsx_columns(reader.fieldnames or [], field_filter)
+        for csv_row in reader:
+            if csv_row.get('notice type') == 'NA':
+                #the placeholder row for a date without notices
+                continue
+            key = sheet_key(csv_row, sheet_by)
+            ws, part, n_rows = sheets.get(key, (None, 0, max_rows))
+            if n_rows >= max_rows:
+                part += 1
+                ws = wb.create_sheet(sheet_title(key, part))
+                ws.append(columns)
+                n_rows = 1
+                sheet_rows[ws.title] = 0
+            ws.append([clean_cell(csv_row.get(column), ws) for column in columns])
+            sheets[key] = (ws, part, n_rows + 1)
+            sheet_rows[ws.title] += 1
+    if not sheets:
+        ws = wb.create_sheet('NA')
+        ws.append(columns)
+    wb.save(xlsx_file)
+
+    return sheet_rows